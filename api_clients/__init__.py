@@ -1,3 +1,8 @@
 from .sudreg_api_client import SudregApiClient
 from .companywall_api_client import CompanyWallApiClient
-__all__ = ["SudregApiClient", "CompanyWallApiClient"]
+from .async_sudreg_api_client import AsyncSudregApiClient
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .response_cache import ResponseCache
+from .token_manager import TokenManager, AsyncTokenManager
+__all__ = ["SudregApiClient", "CompanyWallApiClient", "AsyncSudregApiClient", "RateLimiter", "RetryPolicy", "ResponseCache", "TokenManager", "AsyncTokenManager"]
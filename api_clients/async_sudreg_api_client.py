@@ -0,0 +1,147 @@
+import asyncio
+import base64
+import logging
+import aiohttp
+
+from config import Config
+from metrics import registry
+from db.codec import codec
+from .rate_limiter import RateLimiter
+from .sudreg_api_client import SudregApiClient
+from .token_manager import AsyncTokenManager
+from .retry import RetryPolicy, send_with_retry_async
+
+class AsyncSudregApiClient:
+    config: Config
+    token_manager: AsyncTokenManager
+    rate_limiter: RateLimiter
+    retry_policy: RetryPolicy
+    session: aiohttp.ClientSession | None
+
+    # pass the sync client's rate_limiter to keep one request ceiling across both clients
+    def __init__(self, config: Config, rate_limiter: RateLimiter | None = None):
+        self.config = config
+        self.token_manager = AsyncTokenManager(self.request_token)
+        self.rate_limiter = rate_limiter or RateLimiter(config.max_requests_per_second)
+        self.retry_policy = RetryPolicy(config.max_retries)
+        self.session = None
+
+    async def __aenter__(self) -> "AsyncSudregApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            connector = aiohttp.TCPConnector(ssl=False, limit=max(self.config.page_prefetch, self.config.fetch_workers))
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def authenticate(self):
+        await self.token_manager.refresh()
+
+    async def request_token(self) -> dict:
+        auth_str = f"{self.config.client_id}:{self.config.client_secret}"
+        auth_b64 = base64.b64encode(auth_str.encode("utf-8")).decode("utf-8")
+
+        headers = {
+            "Authorization": f"Basic {auth_b64}",
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Accept": "application/json"
+        }
+
+        data = {
+            "grant_type": "client_credentials"
+        }
+
+        async with self.get_session().post(f"{self.config.api_url}/api/oauth/token", headers=headers, data=data) as response:
+            text = await response.text()
+            if response.status in (200, 201):
+                return await response.json(content_type=None)
+            else:
+                logging.error("Greška %s: %s", response.status, text)
+                raise Exception(f"Greška {response.status}: {text}")
+
+    async def get_response(self, endpoint: str) -> dict:
+        with registry.timer("sudreg_request_seconds", endpoint=endpoint.split("?")[0]):
+            return await self.fetch_response(endpoint)
+
+    async def fetch_response(self, endpoint: str) -> dict:
+        token = await self.token_manager.get_token()
+        status, _, text = await self.send_request(endpoint, token)
+
+        # the token can expire or be revoked early, refresh it once and repeat the request
+        if status == 401:
+            await self.token_manager.invalidate(token)
+            status, _, text = await self.send_request(endpoint, await self.token_manager.get_token())
+
+        registry.inc("sudreg_response_bytes_total", len(text.encode("utf-8")), endpoint=endpoint.split("?")[0])
+        if status in (200, 201):
+            return codec.loads(text)
+        logging.error("Greška %s: %s", status, text)
+        raise Exception(f"Greška {status}: {text}")
+
+    async def send_request(self, endpoint: str, token: str) -> tuple[int, dict, str]:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json"
+        }
+
+        async def send():
+            async with self.get_session().get(f"{self.config.api_url}/{endpoint}", headers=headers) as response:
+                return response.status, dict(response.headers), await response.text()
+
+        return await send_with_retry_async(send, self.rate_limiter, self.retry_policy)
+
+    async def get_company_list(self, offset: int | None = None) -> list:
+        endpoint = "api/javni/tvrtke"
+        if offset is not None:
+            endpoint += f"?offset={offset}"
+
+        return await self.get_response(endpoint)
+
+    async def get_company_details_by_oib(self, oib: str) -> dict:
+        endpoint = f"api/javni/detalji_subjekta?tip_identifikatora=OIB&identifikator={oib}&expand_relations=true"
+        return await self.get_response(endpoint)
+
+    async def get_company_details_by_mbs(self, mbs: str) -> dict:
+        endpoint = f"api/javni/detalji_subjekta?tip_identifikatora=MBS&identifikator={mbs}&expand_relations=true"
+        return await self.get_response(endpoint)
+
+    async def get_company_page(self, offset: int) -> list:
+        try:
+            return await self.get_company_list(offset)
+        except Exception as e:
+            if SudregApiClient.NO_ROWS_MESSAGE in str(e):
+                return []
+            raise e
+
+    async def iter_company_pages(self, offset: int = 0, prefetch: int = 4):
+        # keep `prefetch` page requests in flight ahead of the consumer, yield them in offset order
+        in_flight: list[tuple[int, asyncio.Task]] = []
+        next_offset = offset
+
+        try:
+            while True:
+                while len(in_flight) < prefetch:
+                    in_flight.append((next_offset, asyncio.create_task(self.get_company_page(next_offset))))
+                    next_offset += SudregApiClient.PAGE_SIZE
+
+                page_offset, task = in_flight.pop(0)
+                companies = await task
+                if len(companies) == 0:
+                    break
+
+                yield page_offset, companies
+                if len(companies) < SudregApiClient.PAGE_SIZE:
+                    break
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
@@ -1,92 +1,140 @@
+import threading
 import requests
-from bs4 import BeautifulSoup
-import re
+from concurrent.futures import Executor
+from typing import Callable
+from urllib.parse import urljoin, urlsplit
 
 from config import Config
-from db import Database
+from metrics import registry
+from db import Database, ProfileIndex
+from .host_scheduler import HostScheduler
+from .retry import RetryPolicy, send_with_retry
+from .response_cache import ResponseCache, create_response_cache
+from .companywall_parser import parse_search_page, parse_profile_page, parse_profile_oib, parse_sitemap
 
 class CompanyWallApiClient:
     config: Config
     db: Database
     base_url: str
+    local: threading.local
+    scheduler: HostScheduler
+    retry_policy: RetryPolicy
+    response_cache: ResponseCache | None
+    profile_index: ProfileIndex | None
 
-    def __init__(self, config: Config, db: Database):
+    def __init__(self, config: Config, db: Database, profile_index: ProfileIndex | None = None):
         self.config = config
         self.db = db
-        self.base_url = "https://www.companywall.hr"
+        self.profile_index = profile_index
+        self.base_url = config.companywall_url.rstrip("/")
+        self.local = threading.local()
+        self.scheduler = HostScheduler(config.companywall_requests_per_second, config.companywall_connections)
+        self.retry_policy = RetryPolicy(config.max_retries)
+        self.response_cache = create_response_cache(config, "companywall", {
+            "pretraga": config.cache_ttl_companywall,
+            "tvrtka/": config.cache_ttl_companywall,
+        })
+
+    # one session per worker thread, requests.Session is not safe to share between threads
+    def get_session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    # timed per page type: pretraga, tvrtka, sitemap...
+    def fetch(self, url: str) -> tuple[int, str]:
+        with registry.timer("companywall_request_seconds", page=urlsplit(url).path.split("/")[1]):
+            return self.fetch_page(url)
+
+    # returns (status_code, text), straight from the cache when it holds a fresh copy
+    def fetch_page(self, url: str) -> tuple[int, str]:
+        cached = self.response_cache.get(url) if self.response_cache else None
+        if cached and self.response_cache.is_fresh(url, cached):
+            return 200, cached.body.decode("utf-8")
+
+        headers = self.response_cache.conditional_headers(cached) if cached else {}
+        session = self.get_session()
+        with self.scheduler.slot(url):
+            response = send_with_retry(lambda: session.get(url, headers=headers), self.scheduler.get_rate_limiter(url), self.retry_policy)
+
+        if response.status_code == 304 and cached:
+            self.response_cache.revalidate(url, cached)
+            return 200, cached.body.decode("utf-8")
+
+        registry.inc("companywall_response_bytes_total", len(response.content))
+        if response.status_code == 200 and self.response_cache:
+            self.response_cache.put(url, response.text.encode("utf-8"), response.headers)
+        return response.status_code, response.text
 
     def search_company(self, oib: str):
         search_url = f"{self.base_url}/pretraga?query={oib}"
-        response = requests.get(search_url)
-        return response.text
+        _, text = self.fetch(search_url)
+        return text
+
+    def fetch_search_page(self, oib: str) -> tuple[int, str]:
+        return self.fetch(f"{self.base_url}/pretraga?query={oib}")
+
+    def fetch_profile_page(self, href: str) -> tuple[int, str]:
+        return self.fetch(urljoin(self.base_url, href))
+
+    # with a pool the time includes the round trip to the worker process
+    def parse(self, parser: Callable[[str], any], html: str, parse_pool: Executor | None = None):
+        with registry.timer("companywall_parse_seconds", parser=parser.__name__):
+            return parse_pool.submit(parser, html).result() if parse_pool else parser(html)
+
+    # parse_pool is an optional process pool, the parsing then runs outside of the fetching thread;
+    # raises when a page is not accessible or the search finds no profile, so the company is retried
+    def extract_company_data(self, oib: str, parse_pool: Executor | None = None):
+        parse = lambda f, html: self.parse(f, html, parse_pool)
+
+        # a known profile is fetched straight away, one request instead of two
+        href = self.profile_index.get(oib) if self.profile_index else None
+        if href:
+            status_code, text = self.fetch_profile_page(href)
+            if status_code == 200:
+                return parse(parse_profile_page, text)
+            if status_code not in (404, 410):
+                raise Exception(f"Greška profile page not accessible for OIB {oib}: {status_code}")
+            # the profile moved, look it up again
+            self.profile_index.delete(oib)
 
-    def extract_company_data(self, oib: str):
         # Step 1: Search for the company profile URL on CompanyWall
-        search_url = f"https://www.companywall.hr/pretraga?query={oib}"
-        response = requests.get(search_url)
-        if response.status_code != 200:
-            return {"error": "Search page not accessible"}
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the first link to a company profile (assuming it's the top result)
-        profile_link = None
-        for a in soup.find_all('a', href=True):
-            if '/tvrtka/' in a['href']:
-                profile_link = "https://www.companywall.hr" + a['href']
-                break
-        
+        status_code, text = self.fetch_search_page(oib)
+        if status_code != 200:
+            raise Exception(f"Greška search page not accessible for OIB {oib}: {status_code}")
+
+        profile_link = parse(parse_search_page, text)
         if not profile_link:
-            return {"error": "No profile link found for OIB"}
+            raise Exception(f"Greška no profile link found for OIB {oib}")
 
         # Step 2: Fetch the profile page
-        profile_response = requests.get(profile_link)
-        if profile_response.status_code != 200:
-            return {"error": "Profile page not accessible"}
-
-        profile_soup = BeautifulSoup(profile_response.text, 'html.parser')
-        
-        # Extract company name (usually in <h1> or similar)
-        name = profile_soup.find('h1').text.strip() if profile_soup.find('h1') else "N/A"
-        
-        # Find the financial summary table
-        table = profile_soup.find('table')  # Assuming the first table is the financial one
-        data = {
-            "name": name,
-            "revenues": {},
-            "employees": {},
-            "ratings": "N/A"
-        }
-        
-        if table:
-            rows = table.find_all('tr')
-            years = []
-            for th in rows[0].find_all('th'):  # Get years from header
-                year = th.text.strip()
-                if re.match(r'\d{4}', year):
-                    years.append(year)
-            
-            # Last three years (assuming sorted ascending)
-            last_three_years = sorted(years, reverse=True)[:3]
-            
-            for row in rows[1:]:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) > 0:
-                    label = cells[0].text.strip()
-                    if label == 'Ukupni prihodi':
-                        for i, year in enumerate(years, start=1):
-                            if year in last_three_years:
-                                data["revenues"][year] = cells[i].text.strip()
-                    elif label == 'Broj zaposlenih':
-                        for i, year in enumerate(years, start=1):
-                            if year in last_three_years:
-                                data["employees"][year] = cells[i].text.strip()
-        
-        # Extract ratings if available (look for text containing 'Bonitetna ocjena')
-        ratings_section = profile_soup.find(string=re.compile('Bonitetna ocjena', re.I))
-        if ratings_section:
-            # Assuming it's near a span or div with the rating
-            rating = ratings_section.find_next(string=True).strip()
-            data["ratings"] = rating
-        
-        return data
+        status_code, text = self.fetch_profile_page(profile_link)
+        if status_code != 200:
+            raise Exception(f"Greška profile page not accessible for OIB {oib}: {status_code}")
+
+        if self.profile_index:
+            self.profile_index.put(oib, profile_link)
+        return parse(parse_profile_page, text)
+
+    # profile urls listed by a sitemap, nested sitemap indexes are followed
+    def iter_sitemap_profiles(self, sitemap_url: str):
+        pending = [sitemap_url]
+        while pending:
+            status_code, text = self.fetch(pending.pop(0))
+            if status_code != 200:
+                continue
+            sitemaps, urls = parse_sitemap(text)
+            pending.extend(sitemaps)
+            yield from (u for u in urls if '/tvrtka/' in u)
+
+    # fetches one profile found by a crawl, returns (oib, details) and remembers the profile for the OIB
+    def discover_profile(self, href: str, parse_pool: Executor | None = None) -> tuple[str | None, dict | None]:
+        parse = lambda f, html: self.parse(f, html, parse_pool)
+        status_code, text = self.fetch_profile_page(href)
+        if status_code != 200:
+            return None, None
+
+        oib = parse(parse_profile_oib, text)
+        if oib and self.profile_index:
+            self.profile_index.put(oib, href)
+        return oib, parse(parse_profile_page, text)
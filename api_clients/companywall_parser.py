@@ -0,0 +1,74 @@
+import re
+
+import lxml.etree
+import lxml.html
+
+# the page parsers are plain module functions so they can run in a process pool
+
+YEAR = re.compile(r'\d{4}')
+RATING_XPATH = ("(//text()[contains(translate(., 'BONITETNAOCJ', 'bonitetnaocj'), 'bonitetna ocjena')])[1]"
+                "/following::text()[1]")
+
+# href of the first company profile in the search results (assuming it's the top result)
+def parse_search_page(html: str) -> str | None:
+    if not html:
+        return None
+    hrefs = lxml.html.fromstring(html).xpath("//a[contains(@href, '/tvrtka/')][1]/@href")
+    return hrefs[0] if hrefs else None
+
+def parse_profile_page(html: str) -> dict:
+    data = {
+        "name": "N/A",
+        "revenues": {},
+        "employees": {},
+        "ratings": "N/A"
+    }
+    if not html:
+        return data
+    root = lxml.html.fromstring(html)
+
+    names = root.xpath("(//h1)[1]")
+    if names:
+        data["name"] = names[0].text_content().strip()
+
+    # the first table is the financial summary
+    tables = root.xpath("(//table)[1]")
+    if tables:
+        rows = tables[0].xpath(".//tr")
+        years = [y for y in (th.text_content().strip() for th in rows[0].xpath("./th")) if YEAR.match(y)] if rows else []
+        last_three_years = sorted(years, reverse=True)[:3]
+
+        for row in rows[1:]:
+            cells = row.xpath("./td|./th")
+            if not cells:
+                continue
+            label = cells[0].text_content().strip()
+            target = {"Ukupni prihodi": "revenues", "Broj zaposlenih": "employees"}.get(label)
+            if not target:
+                continue
+            for i, year in enumerate(years, start=1):
+                if year in last_three_years and i < len(cells):
+                    data[target][year] = cells[i].text_content().strip()
+
+    # the rating is the text right after the 'Bonitetna ocjena' label
+    ratings = root.xpath(RATING_XPATH)
+    if ratings:
+        data["ratings"] = str(ratings[0]).strip()
+
+    return data
+
+OIB = re.compile(r'OIB\s*:?\s*(\d{11})')
+
+# the OIB shown on a profile page, used to map profiles found by a sitemap crawl
+def parse_profile_oib(html: str) -> str | None:
+    if not html:
+        return None
+    match = OIB.search(lxml.html.fromstring(html).text_content())
+    return match.group(1) if match else None
+
+# returns (nested sitemaps, page urls) of a sitemap or sitemap index
+def parse_sitemap(xml: str) -> tuple[list[str], list[str]]:
+    root = lxml.etree.fromstring(xml.encode("utf-8"))
+    sitemaps = [s.strip() for s in root.xpath("//*[local-name()='sitemap']/*[local-name()='loc']/text()")]
+    urls = [u.strip() for u in root.xpath("//*[local-name()='url']/*[local-name()='loc']/text()")]
+    return sitemaps, urls
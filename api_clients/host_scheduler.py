@@ -0,0 +1,35 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from .rate_limiter import RateLimiter
+
+class HostScheduler:
+    # politeness per host: at most `connections` requests in flight and `rate` requests per second,
+    # shared by every worker thread that talks to the same host
+    rate: float | None
+    connections: int
+    hosts: dict[str, tuple[threading.Semaphore, RateLimiter]]
+    lock: threading.Lock
+
+    def __init__(self, rate: float | None = None, connections: int = 2):
+        self.rate = rate
+        self.connections = max(1, connections)
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get_host(self, url: str) -> tuple[threading.Semaphore, RateLimiter]:
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (threading.Semaphore(self.connections), RateLimiter(self.rate))
+            return self.hosts[host]
+
+    def get_rate_limiter(self, url: str) -> RateLimiter:
+        return self.get_host(url)[1]
+
+    @contextmanager
+    def slot(self, url: str):
+        semaphore, _ = self.get_host(url)
+        with semaphore:
+            yield
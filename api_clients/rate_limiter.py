@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+class RateLimiter:
+    # token bucket whose rate adapts AIMD style: successes grow the rate back towards max_rate,
+    # a 429 halves it and its Retry-After pauses every caller
+    INCREASE_STEP = 0.02
+    DECREASE_FACTOR = 0.5
+    # concurrent workers usually hit the same 429 burst, it should only count as one decrease
+    DECREASE_COOLDOWN = 1.0
+
+    rate: float | None
+    max_rate: float | None
+    min_rate: float
+    burst: float
+    tokens: float
+    updated: float
+    paused_until: float
+    last_decrease: float
+    lock: threading.Lock
+
+    def __init__(self, rate: float | None = None, min_rate: float = 0.2, burst: float = 1):
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate) if rate else min_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # take a token under the lock and return how long to wait for it
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.paused_until - now)
+            if not self.rate:
+                return delay
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens < 0:
+                delay = max(delay, -self.tokens / self.rate)
+            return delay
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        if not self.max_rate or self.rate >= self.max_rate:
+            return
+        with self.lock:
+            # divided by the current rate, so the rate grows by INCREASE_STEP * max_rate per second
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.INCREASE_STEP / self.rate)
+
+    def on_throttle(self, retry_after: float | None = None):
+        with self.lock:
+            now = time.monotonic()
+            if self.rate and now - self.last_decrease >= self.DECREASE_COOLDOWN:
+                self.rate = max(self.min_rate, self.rate * self.DECREASE_FACTOR)
+                self.last_decrease = now
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def on_response(self, status: int, retry_after: float | None = None):
+        if status == 429:
+            self.on_throttle(retry_after)
+        elif status < 400:
+            self.on_success()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+class CacheEntry:
+    path: str
+    meta: dict
+    body: bytes
+
+    def __init__(self, path: str, meta: dict, body: bytes):
+        self.path = path
+        self.meta = meta
+        self.body = body
+
+    def age(self) -> float:
+        return time.time() - self.meta.get("stored_at", 0)
+
+class ResponseCache:
+    # every entry is one file, a JSON metadata line followed by the raw body; the file mtime
+    # doubles as the last-used time for LRU eviction
+    directory: str
+    max_bytes: int
+    ttls: dict[str, float]
+    default_ttl: float
+    lock: threading.Lock
+    sizes: dict[str, tuple[int, float]] | None
+    total_bytes: int
+
+    def __init__(self, directory: str, max_bytes: int, ttls: dict[str, float] | None = None, default_ttl: float = 0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        self.sizes = None
+        self.total_bytes = 0
+
+    # the key only depends on the endpoint and its parameters, not on their order
+    def key(self, url: str) -> str:
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get_path(self, url: str) -> str:
+        key = self.key(url)
+        return os.path.join(self.directory, key[:2], key)
+
+    # ttl of the longest configured prefix of the url path, 0 means the url is never cached
+    def get_ttl(self, url: str) -> float:
+        path = urlsplit(url).path.lstrip("/")
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def is_cacheable(self, url: str) -> bool:
+        return self.get_ttl(url) > 0
+
+    def is_fresh(self, url: str, entry: CacheEntry) -> bool:
+        return entry.age() < self.get_ttl(url)
+
+    def get(self, url: str) -> CacheEntry | None:
+        if not self.is_cacheable(url):
+            return None
+
+        path = self.get_path(url)
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        self.touch(path)
+        return CacheEntry(path, meta, body)
+
+    def conditional_headers(self, entry: CacheEntry | None) -> dict[str, str]:
+        headers = {}
+        if entry and entry.meta.get("etag"):
+            headers["If-None-Match"] = entry.meta["etag"]
+        if entry and entry.meta.get("last_modified"):
+            headers["If-Modified-Since"] = entry.meta["last_modified"]
+        return headers
+
+    def put(self, url: str, body: bytes, headers: dict | None = None):
+        if not self.is_cacheable(url):
+            return
+
+        headers = headers or {}
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        self.write(self.get_path(url), meta, body)
+
+    # a 304 confirms the cached body, only its age starts over
+    def revalidate(self, url: str, entry: CacheEntry):
+        entry.meta["stored_at"] = time.time()
+        self.write(entry.path, entry.meta, entry.body)
+
+    def write(self, path: str, meta: dict, body: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode("utf-8"))
+            f.write(b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+        self.track(path, os.path.getsize(path))
+
+    def touch(self, path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            return
+        with self.lock:
+            if self.sizes is not None and path in self.sizes:
+                self.sizes[path] = (self.sizes[path][0], time.time())
+
+    def track(self, path: str, size: int):
+        with self.lock:
+            self.load_sizes()
+            previous = self.sizes.get(path)
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self.sizes[path] = (size, time.time())
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def load_sizes(self):
+        if self.sizes is not None:
+            return
+
+        self.sizes = {}
+        self.total_bytes = 0
+        if not os.path.isdir(self.directory):
+            return
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                self.sizes[entry.path] = (stat.st_size, stat.st_mtime)
+                self.total_bytes += stat.st_size
+
+    # drop least recently used entries until the cache is back under 90% of its budget
+    def evict(self):
+        target = self.max_bytes * 0.9
+        for path, (size, _) in sorted(self.sizes.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            del self.sizes[path]
+            self.total_bytes -= size
+
+def create_response_cache(config, name: str, ttls: dict[str, float]) -> ResponseCache | None:
+    if not config.cache_dir:
+        return None
+    return ResponseCache(os.path.join(config.cache_dir, name), config.cache_max_mb * 1024 * 1024, ttls)
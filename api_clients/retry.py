@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from itertools import count
+from typing import Awaitable, Callable
+
+import aiohttp
+import requests
+
+from metrics import registry
+from .rate_limiter import RateLimiter
+
+class RetryPolicy:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    max_retries: int
+    base_delay: float
+    max_delay: float
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 60):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    # exponential backoff with full jitter, so workers that failed together do not retry together
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # seconds to wait before the next attempt, None when the response should be returned as it is;
+    # status is None for connection errors and timeouts
+    def get_delay(self, attempt: int, status: int | None, retry_after: float | None = None) -> float | None:
+        if status is not None and status not in self.RETRY_STATUSES:
+            return None
+        if attempt >= self.max_retries:
+            return None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.backoff(attempt)
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def send_with_retry(send: Callable[[], requests.Response], rate_limiter: RateLimiter, retry_policy: RetryPolicy) -> requests.Response:
+    for attempt in count():
+        rate_limiter.acquire()
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            delay = retry_policy.get_delay(attempt, None)
+            if delay is None:
+                raise e
+            registry.inc("http_retries_total", reason=type(e).__name__)
+            logging.warning("Greška %s, ponavljam za %.1fs", e, delay)
+            time.sleep(delay)
+            continue
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        rate_limiter.on_response(response.status_code, retry_after)
+        delay = retry_policy.get_delay(attempt, response.status_code, retry_after)
+        if delay is None:
+            return response
+
+        registry.inc("http_retries_total", reason=str(response.status_code))
+        logging.warning("Greška %s, ponavljam za %.1fs", response.status_code, delay)
+        time.sleep(delay)
+
+# send returns (status, headers, body) so the connection is released before any waiting
+async def send_with_retry_async(send: Callable[[], Awaitable[tuple[int, dict, str]]], rate_limiter: RateLimiter, retry_policy: RetryPolicy) -> tuple[int, dict, str]:
+    for attempt in count():
+        await rate_limiter.acquire_async()
+        try:
+            status, headers, body = await send()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            delay = retry_policy.get_delay(attempt, None)
+            if delay is None:
+                raise e
+            registry.inc("http_retries_total", reason=type(e).__name__)
+            logging.warning("Greška %s, ponavljam za %.1fs", e, delay)
+            await asyncio.sleep(delay)
+            continue
+
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        rate_limiter.on_response(status, retry_after)
+        delay = retry_policy.get_delay(attempt, status, retry_after)
+        if delay is None:
+            return status, headers, body
+
+        registry.inc("http_retries_total", reason=str(status))
+        logging.warning("Greška %s, ponavljam za %.1fs", status, delay)
+        await asyncio.sleep(delay)
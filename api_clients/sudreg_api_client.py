@@ -1,19 +1,54 @@
 import base64
 import logging
+import threading
 import requests
 
 from config import Config
+from metrics import registry
+from db.codec import codec
+from .rate_limiter import RateLimiter
+from .token_manager import TokenManager
+from .retry import RetryPolicy, send_with_retry
+from .response_cache import ResponseCache, create_response_cache
 
 requests.packages.urllib3.disable_warnings()
 
 class SudregApiClient:
+    PAGE_SIZE = 1000
+    NO_ROWS_MESSAGE = "Vaš zahtjev nije vratio ni jedan redak"
+
     config: Config
-    auth_token: str
+    token_manager: TokenManager
+    rate_limiter: RateLimiter
+    retry_policy: RetryPolicy
+    response_cache: ResponseCache | None
+    local: threading.local
 
     def __init__(self, config: Config):
         self.config = config
+        self.token_manager = TokenManager(self.request_token)
+        self.rate_limiter = RateLimiter(config.max_requests_per_second)
+        self.retry_policy = RetryPolicy(config.max_retries)
+        self.response_cache = create_response_cache(config, "sudreg", {"api/javni/detalji_subjekta": config.cache_ttl_details})
+        self.local = threading.local()
+
+    @property
+    def auth_token(self) -> str:
+        return self.token_manager.get_token()
+
+    # one keep-alive session per thread, so every worker reuses its own pooled connection
+    def get_session(self) -> requests.Session:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.verify = False
+            self.local.session = session
+        return session
 
     def authenticate(self):
+        self.token_manager.refresh()
+
+    def request_token(self) -> dict:
         auth_str = f"{self.config.client_id}:{self.config.client_secret}"
         auth_b64 = base64.b64encode(auth_str.encode("utf-8")).decode("utf-8")
 
@@ -27,37 +62,64 @@ class SudregApiClient:
             "grant_type": "client_credentials"
         }
 
-        response = requests.post(
+        response = self.get_session().post(
             f"{self.config.api_url}/api/oauth/token", 
             headers=headers, 
-            data=data,
-            verify=False
+            data=data
         )
         
         if response.status_code in (200, 201):
-            token_data = response.json()
-            self.auth_token = token_data["access_token"]
+            return response.json()
         else:
             logging.error("Greška %s: %s", response.status_code, response.text)
             raise Exception(f"Greška {response.status_code}: {response.text}")
 
+    # timed per endpoint path, the query string would give every company its own series
     def get_response(self, endpoint: str) -> dict:
-        headers = {
-            "Authorization": f"Bearer {self.auth_token}",
-            "Accept": "application/json"
-        }
+        with registry.timer("sudreg_request_seconds", endpoint=endpoint.split("?")[0]):
+            return self.fetch_response(endpoint)
 
-        response = requests.get(
-            f"{self.config.api_url}/{endpoint}", 
-            headers=headers, 
-            verify=False)
+    def fetch_response(self, endpoint: str) -> dict:
+        url = f"{self.config.api_url}/{endpoint}"
+        cached = self.response_cache.get(url) if self.response_cache else None
+        if cached and self.response_cache.is_fresh(url, cached):
+            registry.inc("sudreg_cache_hits_total")
+            return codec.loads(cached.body)
 
+        conditional_headers = self.response_cache.conditional_headers(cached) if cached else {}
+        token = self.token_manager.get_token()
+        response = self.send_request(url, token, conditional_headers)
+
+        # the token can expire or be revoked early, refresh it once and repeat the request
+        if response.status_code == 401:
+            self.token_manager.invalidate(token)
+            response = self.send_request(url, self.token_manager.get_token(), conditional_headers)
+
+        if response.status_code == 304 and cached:
+            self.response_cache.revalidate(url, cached)
+            return codec.loads(cached.body)
+
+        registry.inc("sudreg_response_bytes_total", len(response.content), endpoint=endpoint.split("?")[0])
         if response.status_code in (200, 201):
-            return response.json()
+            if self.response_cache:
+                self.response_cache.put(url, response.content, response.headers)
+            return codec.loads(response.content)
         else:
             logging.error("Greška %s: %s", response.status_code, response.text)
             raise Exception(f"Greška {response.status_code}: {response.text}")
 
+    def send_request(self, url: str, token: str, extra_headers: dict | None = None) -> requests.Response:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/json",
+            **(extra_headers or {})
+        }
+
+        return send_with_retry(
+            lambda: self.get_session().get(url, headers=headers),
+            self.rate_limiter,
+            self.retry_policy)
+
     def get_company_list(self, offset: int | None = None) -> list:
         endpoint = "api/javni/tvrtke"
         if offset is not None:
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable
+
+class TokenManager:
+    # refresh this many seconds before the token actually expires
+    REFRESH_MARGIN = 60
+
+    fetch_token: Callable[[], dict]
+    access_token: str | None
+    refresh_at: float | None
+    lock: threading.Lock
+
+    def __init__(self, fetch_token: Callable[[], dict]):
+        self.fetch_token = fetch_token
+        self.access_token = None
+        self.refresh_at = None
+        self.lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        if self.access_token is None:
+            return True
+        return self.refresh_at is not None and time.monotonic() >= self.refresh_at
+
+    # single flight: whoever takes the lock first refreshes, everybody queued behind it reuses the result;
+    # the token is read under the lock, another thread may invalidate it right after the lock is released
+    def get_token(self) -> str:
+        token = self.access_token
+        if token is None or self.needs_refresh():
+            with self.lock:
+                if self.needs_refresh():
+                    self.store(self.fetch_token())
+                token = self.access_token
+        return token
+
+    def refresh(self) -> str:
+        with self.lock:
+            self.store(self.fetch_token())
+            return self.access_token
+
+    def invalidate(self, token: str):
+        with self.lock:
+            if self.access_token == token:
+                self.access_token = None
+
+    def store(self, token_data: dict):
+        self.access_token = token_data["access_token"]
+        expires_in = token_data.get("expires_in")
+        if not expires_in:
+            self.refresh_at = None
+            return
+        # a short lived token is refreshed halfway through its lifetime, not on every call
+        expires_in = float(expires_in)
+        self.refresh_at = time.monotonic() + expires_in - min(self.REFRESH_MARGIN, expires_in / 2)
+
+class AsyncTokenManager(TokenManager):
+    fetch_token: Callable[[], Awaitable[dict]]
+    lock: asyncio.Lock
+
+    def __init__(self, fetch_token: Callable[[], Awaitable[dict]]):
+        super().__init__(fetch_token)
+        self.lock = asyncio.Lock()
+
+    async def get_token(self) -> str:
+        token = self.access_token
+        if token is None or self.needs_refresh():
+            async with self.lock:
+                if self.needs_refresh():
+                    self.store(await self.fetch_token())
+                token = self.access_token
+        return token
+
+    async def refresh(self) -> str:
+        async with self.lock:
+            self.store(await self.fetch_token())
+            return self.access_token
+
+    async def invalidate(self, token: str):
+        async with self.lock:
+            if self.access_token == token:
+                self.access_token = None
@@ -0,0 +1,44 @@
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from db import Company, CompanyTable
+from .fixtures import make_company_dict
+
+# python -m benchmarks.company_memory [count ...]
+# memory held by the registry in memory, built from freshly decoded JSON lines like the NDJSON loader does
+
+class DictCompany:
+    # the Company layout before __slots__ and interning, kept here only as the baseline
+    def __init__(self, **kwargs):
+        for name in Company.FIELDS:
+            setattr(self, name, kwargs.get(name))
+
+def json_lines(count: int):
+    for i in range(count):
+        yield json.dumps(make_company_dict(i), ensure_ascii=False)
+
+def measure(name: str, build, lines: list[str]):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(json.loads(line) for line in lines)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(lines):>8} {name:>14} {current / 1024 / 1024:>10.1f} {current / len(lines):>10.0f} {elapsed:>8.2f}")
+    del result
+
+def main(counts: list[int]):
+    print(f"{'records':>8} {'layout':>14} {'MB':>10} {'B/record':>10} {'build s':>8}")
+    for count in counts:
+        lines = list(json_lines(count))
+        measure("dict Company", lambda rows: [DictCompany(**r) for r in rows], lines)
+        measure("slots Company", lambda rows: [Company(**r) for r in rows], lines)
+        measure("CompanyTable", CompanyTable.from_dicts, lines)
+        del lines
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 500_000])
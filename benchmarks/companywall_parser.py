@@ -0,0 +1,81 @@
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from api_clients.companywall_parser import parse_search_page, parse_profile_page
+
+# python -m benchmarks.companywall_parser [pages]
+# parses the saved CompanyWall pages in benchmarks/html with the old BeautifulSoup code and the lxml parser
+
+HTML_DIR = os.path.join(os.path.dirname(__file__), "html")
+
+def bs4_search_page(html: str) -> str | None:
+    # the parsing done by extract_company_data before the lxml parser, kept here only as the baseline
+    soup = BeautifulSoup(html, 'html.parser')
+    for a in soup.find_all('a', href=True):
+        if '/tvrtka/' in a['href']:
+            return a['href']
+    return None
+
+def bs4_profile_page(html: str) -> dict:
+    profile_soup = BeautifulSoup(html, 'html.parser')
+    name = profile_soup.find('h1').text.strip() if profile_soup.find('h1') else "N/A"
+    table = profile_soup.find('table')
+    data = {"name": name, "revenues": {}, "employees": {}, "ratings": "N/A"}
+
+    if table:
+        rows = table.find_all('tr')
+        years = [th.text.strip() for th in rows[0].find_all('th') if re.match(r'\d{4}', th.text.strip())]
+        last_three_years = sorted(years, reverse=True)[:3]
+        for row in rows[1:]:
+            cells = row.find_all(['td', 'th'])
+            if len(cells) > 0:
+                label = cells[0].text.strip()
+                target = {"Ukupni prihodi": "revenues", "Broj zaposlenih": "employees"}.get(label)
+                if target:
+                    for i, year in enumerate(years, start=1):
+                        if year in last_three_years:
+                            data[target][year] = cells[i].text.strip()
+
+    ratings_section = profile_soup.find(string=re.compile('Bonitetna ocjena', re.I))
+    if ratings_section:
+        data["ratings"] = ratings_section.find_next(string=True).strip()
+    return data
+
+def parse_both(parse_search, parse_profile, pages: tuple[str, str]):
+    return parse_search(pages[0]), parse_profile(pages[1])
+
+def lxml_pair(pages: tuple[str, str]):
+    return parse_both(parse_search_page, parse_profile_page, pages)
+
+def measure(name: str, run, count: int):
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"{name:>22} {count / elapsed:>10.0f} {elapsed / count * 1000:>10.2f}")
+
+def load(name: str) -> str:
+    with open(os.path.join(HTML_DIR, name), 'r') as f:
+        return f.read()
+
+def main(count: int):
+    pages = (load("companywall_search.html"), load("companywall_profile.html"))
+    baseline = parse_both(bs4_search_page, bs4_profile_page, pages)
+    result = lxml_pair(pages)
+    if result != baseline:
+        raise Exception(f"Greška parser mismatch: {result} != {baseline}")
+
+    print(f"{'parser':>22} {'pairs/s':>10} {'ms/pair':>10}")
+    measure("bs4 html.parser", lambda: [parse_both(bs4_search_page, bs4_profile_page, pages) for _ in range(count)], count)
+    measure("lxml", lambda: [lxml_pair(pages) for _ in range(count)], count)
+    for processes in (2, 4):
+        with ProcessPoolExecutor(processes) as pool:
+            list(pool.map(lxml_pair, [pages] * processes))
+            measure(f"lxml {processes} processes", lambda: list(pool.map(lxml_pair, [pages] * count, chunksize=16)), count)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,65 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from db import Database
+from .fixtures import make_company_dicts
+
+# python -m benchmarks.database_load [count ...]
+# compares startup time and peak RSS of the legacy JSON file with the streaming NDJSON file
+
+def write_fixtures(directory: str, count: int) -> dict[str, str]:
+    companies = make_company_dicts(count)
+    paths = {
+        "json": os.path.join(directory, f"companies_{count}.json"),
+        "ndjson": os.path.join(directory, f"companies_{count}.ndjson"),
+    }
+
+    with open(paths["json"], 'w') as f:
+        json.dump({"companies": companies, "fetch_job_status": {"offset": count}}, f, indent=2)
+
+    with open(paths["ndjson"], 'w') as f:
+        f.write(json.dumps({"fetch_job_status": {"offset": count}, "count": count}) + "\n")
+        for c in companies:
+            f.write(json.dumps(c, ensure_ascii=False) + "\n")
+
+    return paths
+
+def measure_child(path: str):
+    started = time.perf_counter()
+    db = Database(path)
+    ready = time.perf_counter() - started
+    db.count()
+    db.get_company_my_mbs(10_000_000)
+    first_lookup = time.perf_counter() - started
+    db.ensure_loaded()
+    loaded = time.perf_counter() - started
+
+    print(json.dumps({
+        "ready_s": ready,
+        "first_lookup_s": first_lookup,
+        "loaded_s": loaded,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def measure(path: str) -> dict:
+    output = subprocess.run([sys.executable, "-m", "benchmarks.database_load", "--child", path], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main(counts: list[int]):
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'records':>8} {'format':>7} {'ready s':>9} {'lookup s':>9} {'loaded s':>9} {'peak MB':>9}")
+        for count in counts:
+            for fmt, path in write_fixtures(directory, count).items():
+                r = measure(path)
+                print(f"{count:>8} {fmt:>7} {r['ready_s']:>9.3f} {r['first_lookup_s']:>9.3f} {r['loaded_s']:>9.3f} {r['peak_rss_mb']:>9.1f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        measure_child(sys.argv[2])
+    else:
+        main([int(a) for a in sys.argv[1:]] or [100_000])
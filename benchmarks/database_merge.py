@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import time
+
+from db import Company, Database, SqliteDatabase
+from .fixtures import make_company_dicts
+
+# python -m benchmarks.database_merge [count]
+# merges the listing pages into an empty database and then once more, the way a resumed run sees them;
+# "legacy" is the add_company loop before add_companies, which merged and journaled every row
+
+PAGE_SIZE = 1000
+
+def legacy_add_company(db: Database | SqliteDatabase, company: Company):
+    if isinstance(db, SqliteDatabase):
+        existing = db.get_company_my_mbs(company.mbs)
+        if existing:
+            existing.update_with_values(company)
+            company = existing
+        db.upsert_company(company)
+    else:
+        existing = db.companies.get(company.mbs)
+        if existing is not None:
+            existing.update_with_values(company)
+            company = existing
+        db.companies[company.mbs] = company
+        db.index_company(company)
+        db.journal.append("company", company.to_row())
+    db.is_dirty = True
+
+def list_pages(count: int) -> list[list[dict]]:
+    rows = [{"mbs": r["mbs"], "oib": r["oib"], "ime": r["ime"], "naznaka_imena": r["naznaka_imena"]} for r in make_company_dicts(count)]
+    return [rows[i:i + PAGE_SIZE] for i in range(0, len(rows), PAGE_SIZE)]
+
+# returns the seconds the pass took and how many pages had to be saved
+def merge_pass(db: Database | SqliteDatabase, pages: list[list[dict]], legacy: bool) -> tuple[float, int]:
+    saves = 0
+    started = time.perf_counter()
+    for page in pages:
+        if legacy:
+            for row in page:
+                legacy_add_company(db, Company.from_dict(row))
+        else:
+            db.add_companies(Company.from_dict(row) for row in page)
+        if db.is_dirty:
+            db.save_to_file()
+            saves += 1
+    return time.perf_counter() - started, saves
+
+def main(count: int):
+    pages = list_pages(count)
+    print(f"{count} companies in pages of {PAGE_SIZE}")
+    print(f"{'backend':>8} {'path':>14} {'first s':>8} {'resumed s':>10} {'resumed saves':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend, extension in (("ndjson", "ndjson"), ("sqlite", "sqlite")):
+            for path_name, legacy in (("add_company", True), ("add_companies", False)):
+                file_path = os.path.join(directory, f"{path_name}.{extension}")
+                db = Database(file_path) if backend == "ndjson" else SqliteDatabase(file_path)
+                first, _ = merge_pass(db, pages, legacy)
+                resumed, saves = merge_pass(db, pages, legacy)
+                db.close()
+                print(f"{backend:>8} {path_name:>14} {first:>8.2f} {resumed:>10.2f} {saves:>14}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,34 @@
+import random
+
+ZUPANIJE = [
+    "Grad Zagreb", "Splitsko-dalmatinska županija", "Primorsko-goranska županija", "Osječko-baranjska županija",
+    "Istarska županija", "Zagrebačka županija", "Bjelovarsko-bilogorska županija", "Zadarska županija",
+]
+PRAVNI_OBLICI = ["d.o.o.", "j.d.o.o.", "d.d.", "obrt", "udruga"]
+NASELJA = ["Zagreb", "Split", "Rijeka", "Osijek", "Pula", "Velika Gorica", "Bjelovar", "Zadar"]
+RIJECI = ["STIMO", "HIDRO", "GRADNJA", "TRGOVINA", "USLUGE", "PROJEKT", "INFO", "SERVIS", "TEHNIKA", "PLUS"]
+
+def make_company_dict(i: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed * 1_000_003 + i)
+    naznaka = f"{rnd.choice(RIJECI)} {rnd.choice(RIJECI)} {i}"
+    pravni_oblik = rnd.choice(PRAVNI_OBLICI)
+    return {
+        "mbs": 10_000_000 + i,
+        "ime": f"{naznaka} društvo s ograničenom odgovornošću za graditeljstvo, proizvodnju, trgovinu i usluge",
+        "oib": 10_000_000_000 + i * 7,
+        "djelatnost_sifra": f"{rnd.randint(1, 99):02d}.{rnd.randint(1, 99):02d}",
+        "djelatnost_naziv": "Ostale specijalizirane građevinske djelatnosti",
+        "zupanija": rnd.choice(ZUPANIJE),
+        "adresa": f"Ulica {rnd.choice(RIJECI).title()} {rnd.randint(1, 120)}",
+        "naselje": rnd.choice(NASELJA),
+        "email_adrese": f"info{i}@example.hr" if rnd.random() < 0.6 else "",
+        "telefonski_brojevi": None,
+        "ostalo": None,
+        "gfi_count": rnd.randint(0, 20),
+        "status": rnd.choice([1, 1, 1, 1, 4]),
+        "naznaka_imena": naznaka,
+        "pravni_oblik": pravni_oblik,
+    }
+
+def make_company_dicts(count: int, seed: int = 0) -> list[dict]:
+    return [make_company_dict(i, seed) for i in range(count)]
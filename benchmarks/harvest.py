@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# python -m benchmarks.harvest [--counts 10000 100000 500000] [--latency 0.02] [--error-rate 0.01] [--throttle-rate 0.01]
+# runs the harvest stages, the exporters and a database save/load against the local stub server; every
+# scenario runs in its own process, so the peak RSS column belongs to that scenario alone;
+# --scenarios sequential pipeline compares the three stages run one after another with HarvestPipeline
+
+SCENARIOS = ("list", "details", "companywall", "csv", "parquet", "save", "load")
+# these start from an empty database of their own and run every stage for every company
+END_TO_END = ("sequential", "pipeline")
+
+class QuietProgress:
+    def report(self, event: str, message: str, **fields):
+        pass
+
+def configure_environment(url: str, directory: str, args: argparse.Namespace):
+    os.environ.update({
+        "api_env": "benchmark",
+        "benchmark_client_id": "benchmark",
+        "benchmark_client_secret": "benchmark",
+        "benchmark_api_url": url,
+        "companywall_url": url,
+        "db_file_path": os.path.join(directory, f"companies.{args.format}"),
+        "detail_store_path": os.path.join(directory, "details.sqlite"),
+        "company_filter": "",
+        "company_filter_out": "",
+        "fetch_workers": str(args.workers),
+        "companywall_connections": str(args.workers),
+        "companywall_requests_per_second": "0",
+        "max_requests_per_second": "0",
+        "page_prefetch": str(args.prefetch),
+    })
+
+# returns the number of items the scenario handled successfully
+def run_scenario(scenario: str, directory: str, args: argparse.Namespace) -> int:
+    from config import Config
+    from api_clients import SudregApiClient
+    from db import open_database
+    from services import SudregService, HarvestPipeline
+
+    config = Config()
+    db = open_database(config.db_file_path)
+    if scenario == "load":
+        db.get_all_companies()
+        return db.count()
+
+    service = SudregService(SudregApiClient(config), db, config, QuietProgress())
+    if scenario == "list":
+        service.fetch_all_companies()
+        return db.count()
+    if scenario == "details":
+        companies = db.get_all_companies()[:args.details]
+        return len(companies) - len(service.fetch_company_details(companies, skip_existing=False))
+    if scenario == "companywall":
+        companies = db.get_all_companies()[:args.companywall]
+        return len(companies) - len(service.get_company_details_from_companywall(companies, skip_existing=False))
+    if scenario == "csv":
+        service.export_to_csv(os.path.join(directory, "companies.csv"), exclude_stecaj=False, exclude_no_email=False)
+        return db.count()
+    if scenario == "parquet":
+        service.export_to_parquet(os.path.join(directory, "companies.parquet"))
+        return db.count()
+    if scenario == "save":
+        db.compact()
+        return db.count()
+    if scenario == "sequential":
+        companies = service.fetch_all_companies()
+        failed = service.fetch_company_details(companies)
+        failed += service.get_company_details_from_companywall(companies)
+        return db.count() * 2 - len(failed)
+    if scenario == "pipeline":
+        failed = HarvestPipeline(service, ["list", "details", "companywall"]).run()
+        return db.count() * 2 - len(failed)
+    raise Exception(f"Greška unknown scenario {scenario}")
+
+def measure_child(scenario: str, url: str, directory: str, args: argparse.Namespace):
+    if scenario in END_TO_END:
+        directory = os.path.join(directory, scenario)
+        os.makedirs(directory, exist_ok=True)
+    configure_environment(url, directory, args)
+    started = time.perf_counter()
+    items = run_scenario(scenario, directory, args)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "items": items,
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def start_stub(count: int, args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--count", str(count), "--port", str(args.port),
+         "--latency", str(args.latency), "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate)],
+        stdout=subprocess.PIPE, text=True)
+    stub.stdout.readline()
+    return stub, f"http://127.0.0.1:{args.port}"
+
+def measure(scenario: str, url: str, directory: str, argv: list[str]) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.harvest", "--child", scenario, url, directory, *argv],
+        capture_output=True, text=True)
+    if output.returncode != 0:
+        raise Exception(f"Greška {scenario}: {output.stderr.strip().splitlines()[-1] if output.stderr.strip() else output.returncode}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.harvest")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000], help="companies in the listing, e.g. 10000 100000 500000")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS + END_TO_END)
+    parser.add_argument("--details", type=int, default=5_000, help="companies whose Sudreg details are fetched")
+    parser.add_argument("--companywall", type=int, default=1_000, help="companies scraped from CompanyWall")
+    parser.add_argument("--workers", type=int, default=8, help="fetch_workers and companywall_connections")
+    parser.add_argument("--prefetch", type=int, default=1, help="page_prefetch for the list stage")
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "json", "sqlite"], help="database backend")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8781)
+    return parser
+
+def main(argv: list[str]):
+    args = create_parser().parse_args(argv)
+    # the children only need the options that change what a scenario does
+    child_argv = ["--details", str(args.details), "--companywall", str(args.companywall), "--workers", str(args.workers),
+                  "--prefetch", str(args.prefetch), "--format", args.format]
+
+    print(f"{'records':>8} {'scenario':>12} {'items':>8} {'seconds':>9} {'items/s':>10} {'peak MB':>9}")
+    for count in args.counts:
+        stub, url = start_stub(count, args)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for scenario in args.scenarios:
+                    r = measure(scenario, url, directory, child_argv)
+                    rate = r["items"] / r["seconds"] if r["seconds"] > 0 else 0
+                    print(f"{count:>8} {scenario:>12} {r['items']:>8} {r['seconds']:>9.2f} {rate:>10.0f} {r['peak_rss_mb']:>9.1f}", flush=True)
+        finally:
+            stub.terminate()
+            stub.wait()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 4 and sys.argv[1] == "--child":
+        measure_child(sys.argv[2], sys.argv[3], sys.argv[4], create_parser().parse_args(sys.argv[5:]))
+    else:
+        main(sys.argv[1:])
@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from db import Company, Database, DetailStore
+from db.data_models import intern_str
+from db.codec import AVAILABLE, get_codec, codec
+from .fixtures import make_company_dicts
+
+# python -m benchmarks.json_codec [count]
+# times details decoding and injection, detail store writes and a database save/load with every
+# installed JSON codec; "legacy" is the code before the codec layer (stdlib json, kwargs Company,
+# pretty-printed details, one object per NDJSON line)
+
+PAYLOAD_PATH = os.path.join(os.path.dirname(__file__), "payloads", "detalji_subjekta.json")
+
+def legacy_inject(c: Company, details: dict):
+    # inject_from_sudreg_object before the codec layer, kept here only as the baseline
+    c.oib = details.get('oib')
+    c.djelatnost_sifra = intern_str(details.get('pretezita_djelatnost', {}).get('sifra', ''))
+    c.djelatnost_naziv = intern_str(details.get('pretezita_djelatnost', {}).get('puni_naziv', ''))
+    c.zupanija = intern_str(details.get('sjediste', {}).get('naziv_zupanije', ''))
+    c.adresa = details.get('sjediste', {}).get('ulica', '') + ' ' + str(details.get('sjediste', {}).get('kucni_broj', ''))
+    c.naselje = intern_str(details.get('sjediste', {}).get('naziv_naselja', ''))
+    c.email_adrese = ', '.join([e['adresa'] for e in details.get('email_adrese', [])])
+    c.gfi_count = len(details.get('gfi', []))
+    c.status = details.get('status', 0)
+    c.naznaka_imena = details.get('tvrtka', {}).get('naznaka_imena', '')
+    c.pravni_oblik = intern_str(details.get('pravni_oblik', {}).get('vrsta_pravnog_oblika').get('kratica', ''))
+
+def timed(f) -> float:
+    started = time.perf_counter()
+    f()
+    return time.perf_counter() - started
+
+def measure_details(name: str, count: int) -> dict:
+    with open(PAYLOAD_PATH, 'rb') as f:
+        body = f.read()
+    rows = [{"mbs": 10_000_000 + i, "oib": 10_000_000_000 + i * 7, "ime": "TVRTKA d.o.o.", "naznaka_imena": "TVRTKA"} for i in range(count)]
+    legacy = name == "legacy"
+    selected = get_codec("json" if legacy else name)
+
+    def decode_inject():
+        for row in rows:
+            details = selected.loads(body)
+            if legacy:
+                legacy_inject(Company(**row), details)
+            else:
+                Company.from_dict(row).inject_from_sudreg_object(details)
+
+    details = json.loads(body)
+    encode = (lambda: [json.dumps(details, indent=2) for _ in rows]) if legacy else (lambda: [selected.dumps(details) for _ in rows])
+    return {"decode_inject_s": timed(decode_inject), "encode_s": timed(encode)}
+
+def measure_child(name: str, count: int):
+    # the codec of the stores is picked from json_codec when db is imported, the parent sets it
+    assert name == "legacy" or codec.name == name
+    result = measure_details(name, count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "companies.ndjson")
+        rows = make_company_dicts(count)
+        if name == "legacy":
+            def save():
+                with open(path, 'w') as f:
+                    f.write(json.dumps({"fetch_job_status": {}, "count": count}) + "\n")
+                    for c in companies:
+                        f.write(json.dumps(c.to_dict(), ensure_ascii=False) + "\n")
+
+            # the loader still reads one object per line, with the stdlib codec of this child
+            companies = [Company(**r) for r in rows]
+            result["save_s"] = timed(save)
+            result["load_s"] = timed(lambda: Database(path).ensure_loaded())
+        else:
+            db = Database(path)
+            for r in rows:
+                db.companies[r["mbs"]] = Company.from_dict(r)
+            result["save_s"] = timed(db.write_snapshot)
+            result["load_s"] = timed(lambda: Database(path).ensure_loaded())
+        result["file_mb"] = os.path.getsize(path) / 1024 / 1024
+
+        store = DetailStore(os.path.join(directory, "details.sqlite"), "none")
+        with open(PAYLOAD_PATH, 'rb') as f:
+            details = json.loads(f.read())
+        if name == "legacy":
+            store.encode = lambda d: json.dumps(d, indent=2).encode("utf-8")
+
+        def put_all():
+            for i in range(count):
+                store.put("sudreg", i, details)
+            store.commit()
+
+        result["store_s"] = timed(put_all)
+        store.close()
+
+    print(json.dumps(result))
+
+def measure(name: str, count: int) -> dict:
+    env = {**os.environ, "json_codec": "json" if name == "legacy" else name}
+    output = subprocess.run([sys.executable, "-m", "benchmarks.json_codec", "--child", name, str(count)], capture_output=True, text=True, check=True, env=env)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main(count: int):
+    names = ["legacy"] + [name for name in ("json", "orjson", "msgspec") if AVAILABLE[name]]
+    print(f"{count} details payloads and companies")
+    print(f"{'codec':>8} {'decode+inject s':>16} {'encode s':>9} {'store s':>8} {'save s':>7} {'load s':>7} {'file MB':>8}")
+    for name in names:
+        r = measure(name, count)
+        print(f"{name:>8} {r['decode_inject_s']:>16.3f} {r['encode_s']:>9.3f} {r['store_s']:>8.3f} {r['save_s']:>7.3f} {r['load_s']:>7.3f} {r['file_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "--child":
+        measure_child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from api_clients import SudregApiClient
+from .fixtures import make_company_dict
+
+# python -m benchmarks.stub_server --count 100000 --port 8080 [--latency 0.02] [--error-rate 0.01] [--throttle-rate 0.01] [--seed 0]
+# a local stand-in for the Sudreg API and CompanyWall, serving the recorded payloads in benchmarks/payloads
+# and benchmarks/html for generated companies; point api_url and companywall_url at it
+
+BENCHMARKS_DIR = os.path.dirname(__file__)
+SEARCH_PROFILE_HREF = "/tvrtka/tvrtka-0-doo/MM1000"
+PROFILE_OIB = "12345678901"
+# profiles per sitemap file, /sitemap.xml is an index of them
+SITEMAP_SIZE = 1000
+
+def load_file(*path: str) -> str:
+    with open(os.path.join(BENCHMARKS_DIR, *path), 'r') as f:
+        return f.read()
+
+class StubServer:
+    count: int
+    latency: float
+    error_rate: float
+    throttle_rate: float
+    retry_after: float
+    stats: dict[str, int]
+    random: random.Random
+    lock: threading.Lock
+    server: ThreadingHTTPServer
+    thread: threading.Thread | None = None
+
+    def __init__(self, count: int, port: int = 0, latency: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after: float = 0.2, seed: int = 0):
+        self.count = count
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = {}
+        # seeded, so the same requests in the same order meet the same errors and 429s
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.details_template = json.loads(load_file("payloads", "detalji_subjekta.json"))
+        self.search_html = load_file("html", "companywall_search.html")
+        self.profile_html = load_file("html", "companywall_profile.html")
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # without it every keep-alive response waits for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(handler):
+                handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+                stub.handle(handler, "POST")
+
+            def do_GET(handler):
+                stub.handle(handler, "GET")
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def count_request(self, name: str):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str):
+        url = urlsplit(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.latency:
+            time.sleep(self.latency)
+
+        if method == "POST" and url.path == "/api/oauth/token":
+            self.count_request("token")
+            return self.send_json(handler, 200, {"access_token": "benchmark", "token_type": "bearer", "expires_in": 3600})
+
+        # the token request is never failed on purpose, everything else can be
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            self.count_request("throttled")
+            return self.send_json(handler, 429, {"message": "Too Many Requests"}, {"Retry-After": str(self.retry_after)})
+        if roll < self.throttle_rate + self.error_rate:
+            self.count_request("errors")
+            return self.send_json(handler, 500, {"message": "Internal Server Error"})
+
+        if url.path == "/api/javni/tvrtke":
+            self.count_request("tvrtke")
+            return self.send_company_page(handler, int(query.get("offset", 0)))
+        if url.path == "/api/javni/detalji_subjekta":
+            self.count_request("detalji_subjekta")
+            return self.send_json(handler, 200, self.make_details(query.get("tip_identifikatora", "MBS"), query.get("identifikator", "0")))
+        if url.path == "/pretraga":
+            self.count_request("pretraga")
+            html = self.search_html.replace(SEARCH_PROFILE_HREF, f"/tvrtka/profil/{query.get('query', '')}")
+            return self.send_body(handler, 200, html.encode("utf-8"), "text/html; charset=utf-8")
+        if url.path == "/sitemap.xml":
+            self.count_request("sitemap")
+            return self.send_sitemap_index(handler)
+        if url.path.startswith("/sitemap-"):
+            self.count_request("sitemap")
+            return self.send_sitemap(handler, int(url.path[len("/sitemap-"):-len(".xml")]))
+        if url.path.startswith("/tvrtka/"):
+            self.count_request("tvrtka")
+            html = self.profile_html.replace(PROFILE_OIB, url.path.rsplit("/", 1)[-1])
+            return self.send_body(handler, 200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+        self.count_request("not_found")
+        self.send_json(handler, 404, {"message": "Not Found"})
+
+    def send_company_page(self, handler: BaseHTTPRequestHandler, offset: int):
+        if offset >= self.count:
+            return self.send_json(handler, 404, {"message": SudregApiClient.NO_ROWS_MESSAGE})
+        rows = []
+        for i in range(offset, min(self.count, offset + SudregApiClient.PAGE_SIZE)):
+            c = make_company_dict(i)
+            rows.append({"mbs": c["mbs"], "oib": c["oib"], "ime": c["ime"], "naznaka_imena": c["naznaka_imena"]})
+        self.send_json(handler, 200, rows)
+
+    def send_sitemap_index(self, handler: BaseHTTPRequestHandler):
+        locs = "".join(f"<sitemap><loc>{self.url}/sitemap-{n}.xml</loc></sitemap>" for n in range((self.count + SITEMAP_SIZE - 1) // SITEMAP_SIZE))
+        body = f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</sitemapindex>'
+        self.send_body(handler, 200, body.encode("utf-8"), "application/xml")
+
+    # the profile of every listed company, the OIB is the last part of the href like on the search page
+    def send_sitemap(self, handler: BaseHTTPRequestHandler, n: int):
+        oibs = (make_company_dict(i)["oib"] for i in range(n * SITEMAP_SIZE, min(self.count, (n + 1) * SITEMAP_SIZE)))
+        locs = "".join(f"<url><loc>{self.url}/tvrtka/profil/{oib}</loc></url>" for oib in oibs)
+        body = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+        self.send_body(handler, 200, body.encode("utf-8"), "application/xml")
+
+    def make_details(self, kind: str, identifier: str) -> dict:
+        i = int(identifier) - 10_000_000 if kind == "MBS" else (int(identifier) - 10_000_000_000) // 7
+        c = make_company_dict(max(0, i))
+        details = dict(self.details_template)
+        details.update({
+            "mbs": c["mbs"],
+            "oib": c["oib"],
+            "potpuni_oib": str(c["oib"]),
+            "tvrtka": {"ime": c["ime"], "naznaka_imena": c["naznaka_imena"]},
+            "sjediste": {**self.details_template["sjediste"], "naziv_zupanije": c["zupanija"], "naziv_naselja": c["naselje"]},
+            "email_adrese": [{"redni_broj": 1, "adresa": c["email_adrese"]}] if c["email_adrese"] else [],
+            "status": c["status"],
+        })
+        return details
+
+    def send_json(self, handler: BaseHTTPRequestHandler, status: int, data, headers: dict | None = None):
+        self.send_body(handler, status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def send_body(self, handler: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str, headers: dict | None = None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stub_server")
+    parser.add_argument("--count", type=int, default=10_000, help="companies in the listing")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the error and 429 rolls")
+    args = parser.parse_args()
+
+    stub = StubServer(args.count, args.port, args.latency, args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+    print(f"Stub server for {args.count} companies on {stub.url}", flush=True)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(stub.stats), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,28 @@ class Config:
     db_file_path: str
     company_filter: str
     company_filter_out: str
+    fetch_workers: int
+    max_requests_per_second: float | None
+    page_prefetch: int
+    max_retries: int
+    companywall_url: str
+    companywall_requests_per_second: float | None
+    companywall_connections: int
+    companywall_parse_processes: int
+    cache_dir: str | None
+    cache_max_mb: int
+    cache_ttl_details: float
+    cache_ttl_companywall: float
+    detail_store_path: str
+    detail_compression: str
+    profile_index_path: str | None
+    job_state_path: str | None
+    max_item_retries: int
+    shard_size: int
+    metrics_port: int
+    metrics_dump_path: str | None
+    metrics_dump_interval: float
+    pipeline_queue_size: int
     
     def __init__(self):
         self.api_env = os.getenv("api_env")
@@ -19,4 +41,26 @@ class Config:
         self.api_url = os.getenv(f"{self.api_env}_api_url")
         self.db_file_path = os.getenv("db_file_path")
         self.company_filter = os.getenv("company_filter")
-        self.company_filter_out = os.getenv("company_filter_out")
\ No newline at end of file
+        self.company_filter_out = os.getenv("company_filter_out")
+        self.fetch_workers = int(os.getenv("fetch_workers", "1"))
+        self.max_requests_per_second = float(os.getenv("max_requests_per_second", "0")) or None
+        self.page_prefetch = int(os.getenv("page_prefetch", "1"))
+        self.max_retries = int(os.getenv("max_retries", "5"))
+        self.companywall_url = os.getenv("companywall_url", "https://www.companywall.hr")
+        self.companywall_requests_per_second = float(os.getenv("companywall_requests_per_second", "1")) or None
+        self.companywall_connections = int(os.getenv("companywall_connections", "2"))
+        self.companywall_parse_processes = int(os.getenv("companywall_parse_processes", "2"))
+        self.cache_dir = os.getenv("cache_dir")
+        self.cache_max_mb = int(os.getenv("cache_max_mb", "1024"))
+        self.cache_ttl_details = float(os.getenv("cache_ttl_details", str(7 * 24 * 3600)))
+        self.cache_ttl_companywall = float(os.getenv("cache_ttl_companywall", str(30 * 24 * 3600)))
+        self.detail_store_path = os.getenv("detail_store_path", "data/details.sqlite")
+        self.detail_compression = os.getenv("detail_compression", "zstd")
+        self.profile_index_path = os.getenv("profile_index_path")
+        self.job_state_path = os.getenv("job_state_path")
+        self.max_item_retries = int(os.getenv("max_item_retries", "3"))
+        self.shard_size = int(os.getenv("shard_size", "10000"))
+        self.metrics_port = int(os.getenv("metrics_port", "0"))
+        self.metrics_dump_path = os.getenv("metrics_dump_path")
+        self.metrics_dump_interval = float(os.getenv("metrics_dump_interval", "30"))
+        self.pipeline_queue_size = int(os.getenv("pipeline_queue_size", "200"))
@@ -1,4 +1,11 @@
-from .db import Database
+from .db import Database, open_database
+from .sqlite_db import SqliteDatabase
 from .data_models import Company
+from .company_table import CompanyTable
+from .sync_state import SyncState
+from .detail_store import DetailStore
+from .profile_index import ProfileIndex
+from .job_state import JobState
+from .shard_coordinator import ShardCoordinator
 
-__all__ = ["Database", "Company"]
+__all__ = ["Database", "SqliteDatabase", "open_database", "Company", "CompanyTable", "SyncState", "DetailStore", "ProfileIndex", "JobState", "ShardCoordinator"]
@@ -0,0 +1,62 @@
+import json
+import os
+
+# orjson and msgspec are optional, without them the stdlib json module is used; all three
+# write the same compact UTF-8 JSON, so files written with one are read by the others
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+class JsonCodec:
+    name = "json"
+
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes | str):
+        return json.loads(data)
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def dumps(self, data) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, data: bytes | str):
+        return orjson.loads(data)
+
+class MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        self.encoder = msgspec.json.Encoder()
+        self.decoder = msgspec.json.Decoder()
+
+    def dumps(self, data) -> bytes:
+        return self.encoder.encode(data)
+
+    def loads(self, data: bytes | str):
+        return self.decoder.decode(data)
+
+# what a failed decode raises with any of the codecs
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+CODECS = {"orjson": OrjsonCodec, "msgspec": MsgspecCodec, "json": JsonCodec}
+AVAILABLE = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+
+# "auto" picks the fastest installed codec, asking for a missing one falls back to json
+def get_codec(name: str = "auto") -> JsonCodec | OrjsonCodec | MsgspecCodec:
+    if name == "auto":
+        name = next(n for n in CODECS if AVAILABLE[n])
+    if not AVAILABLE.get(name):
+        name = "json"
+    return CODECS[name]()
+
+# the codec the api clients and the stores use, json_codec=json in the environment forces the stdlib
+codec = get_codec(os.getenv("json_codec", "auto"))
@@ -0,0 +1,59 @@
+from typing import Callable, Iterable
+from .data_models import Company, intern_str
+
+class CompanyTable:
+    # one list per Company field, for bulk filtering and export without a Company object per row
+    INTERNED_COLUMNS = ("djelatnost_sifra", "djelatnost_naziv", "zupanija", "naselje", "pravni_oblik")
+
+    columns: dict[str, list]
+
+    def __init__(self, columns: dict[str, list] | None = None):
+        self.columns = columns if columns is not None else {name: [] for name in Company.FIELDS}
+
+    @classmethod
+    def from_companies(cls, companies: Iterable[Company]) -> "CompanyTable":
+        table = cls()
+        for company in companies:
+            table.append(company)
+        return table
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[dict]) -> "CompanyTable":
+        table = cls()
+        for row in rows:
+            table.append_dict(row)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.columns["mbs"])
+
+    def append(self, company: Company):
+        for name, column in self.columns.items():
+            column.append(getattr(company, name))
+
+    def append_dict(self, row: dict):
+        for name, column in self.columns.items():
+            value = row.get(name)
+            column.append(intern_str(value) if name in self.INTERNED_COLUMNS else value)
+
+    def column(self, name: str) -> list:
+        return self.columns[name]
+
+    def mask(self, name: str, predicate: Callable[[any], bool]) -> list[bool]:
+        return [predicate(v) for v in self.columns[name]]
+
+    def select(self, mask: list[bool]) -> "CompanyTable":
+        return CompanyTable({name: [v for v, keep in zip(column, mask) if keep] for name, column in self.columns.items()})
+
+    def filter(self, **predicates: Callable[[any], bool]) -> "CompanyTable":
+        mask = [True] * len(self)
+        for name, predicate in predicates.items():
+            mask = [m and predicate(v) for m, v in zip(mask, self.columns[name])]
+        return self.select(mask)
+
+    def rows(self, names: Iterable[str] = Company.FIELDS):
+        return zip(*(self.columns[name] for name in names))
+
+    def companies(self):
+        for row in self.rows():
+            yield Company.from_row(row)
@@ -1,6 +1,21 @@
 import json
+import sys
+
+# the same few hundred counties, legal forms, activity codes and places repeat across the whole
+# registry, interning them keeps one copy of each string instead of one per record
+def intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
 
 class Company:
+    FIELDS = (
+        "mbs", "ime", "oib", "djelatnost_sifra", "djelatnost_naziv", "zupanija", "adresa", "naselje",
+        "email_adrese", "telefonski_brojevi", "ostalo", "gfi_count", "status", "naznaka_imena", "pravni_oblik",
+    )
+    # the fields update_with_values takes over from another record of the same company, mbs is the
+    # key and ime keeps the name the company was first stored with
+    MERGED_FIELDS = FIELDS[2:]
+    __slots__ = FIELDS
+
     mbs: str
     ime: str
     oib: str | None
@@ -21,18 +36,59 @@ class Company:
         self.mbs = kwargs.get('mbs')
         self.ime = kwargs.get('ime')
         self.oib = kwargs.get('oib')
-        self.djelatnost_sifra = kwargs.get('djelatnost_sifra')
-        self.djelatnost_naziv = kwargs.get('djelatnost_naziv')
-        self.zupanija = kwargs.get('zupanija')
+        self.djelatnost_sifra = intern_str(kwargs.get('djelatnost_sifra'))
+        self.djelatnost_naziv = intern_str(kwargs.get('djelatnost_naziv'))
+        self.zupanija = intern_str(kwargs.get('zupanija'))
         self.adresa = kwargs.get('adresa')
-        self.naselje = kwargs.get('naselje')
+        self.naselje = intern_str(kwargs.get('naselje'))
         self.email_adrese = kwargs.get('email_adrese')
         self.telefonski_brojevi = kwargs.get('telefonski_brojevi')
         self.ostalo = kwargs.get('ostalo')
         self.gfi_count = kwargs.get('gfi_count')
         self.status = kwargs.get('status', 0)
         self.naznaka_imena = kwargs.get('naznaka_imena')
-        self.pravni_oblik = kwargs.get('pravni_oblik')
+        self.pravni_oblik = intern_str(kwargs.get('pravni_oblik'))
+
+    # the decoded-row path for the stores and the list pages, no kwargs dict is built per record
+    @classmethod
+    def from_dict(cls, data: dict) -> "Company":
+        c = cls.__new__(cls)
+        get = data.get
+        c.mbs = get('mbs')
+        c.ime = get('ime')
+        c.oib = get('oib')
+        c.djelatnost_sifra = intern_str(get('djelatnost_sifra'))
+        c.djelatnost_naziv = intern_str(get('djelatnost_naziv'))
+        c.zupanija = intern_str(get('zupanija'))
+        c.adresa = get('adresa')
+        c.naselje = intern_str(get('naselje'))
+        c.email_adrese = get('email_adrese')
+        c.telefonski_brojevi = get('telefonski_brojevi')
+        c.ostalo = get('ostalo')
+        c.gfi_count = get('gfi_count')
+        c.status = get('status', 0)
+        c.naznaka_imena = get('naznaka_imena')
+        c.pravni_oblik = intern_str(get('pravni_oblik'))
+        return c
+
+    # rows hold the values in FIELDS order, the compact on-disk layout of the NDJSON database
+    @classmethod
+    def from_row(cls, row) -> "Company":
+        c = cls.__new__(cls)
+        (c.mbs, c.ime, c.oib, c.djelatnost_sifra, c.djelatnost_naziv, c.zupanija, c.adresa, c.naselje,
+         c.email_adrese, c.telefonski_brojevi, c.ostalo, c.gfi_count, c.status, c.naznaka_imena, c.pravni_oblik) = row
+        c.djelatnost_sifra = intern_str(c.djelatnost_sifra)
+        c.djelatnost_naziv = intern_str(c.djelatnost_naziv)
+        c.zupanija = intern_str(c.zupanija)
+        c.naselje = intern_str(c.naselje)
+        c.pravni_oblik = intern_str(c.pravni_oblik)
+        return c
+
+    def to_row(self) -> list:
+        return [
+            self.mbs, self.ime, self.oib, self.djelatnost_sifra, self.djelatnost_naziv, self.zupanija, self.adresa, self.naselje,
+            self.email_adrese, self.telefonski_brojevi, self.ostalo, self.gfi_count, self.status, self.naznaka_imena, self.pravni_oblik,
+        ]
 
     # to json
     def to_json(self) -> str:
@@ -57,33 +113,38 @@ class Company:
             "pravni_oblik": self.pravni_oblik,
         }
 
+    # every nested object is looked up once; a missing or null object reads as empty
     def inject_from_sudreg_object(self, details: dict):
-        self.oib = details.get('oib')
-        self.djelatnost_sifra = details.get('pretezita_djelatnost', {}).get('sifra', '')
-        self.djelatnost_naziv = details.get('pretezita_djelatnost', {}).get('puni_naziv', '')
-        self.zupanija = details.get('sjediste', {}).get('naziv_zupanije', '')
-        self.adresa = details.get('sjediste', {}).get('ulica', '') + ' ' + str(details.get('sjediste', {}).get('kucni_broj', ''))
-        self.naselje = details.get('sjediste', {}).get('naziv_naselja', '')
-        self.email_adrese = ', '.join([e['adresa'] for e in details.get('email_adrese', [])])
-        self.gfi_count = len(details.get('gfi', []))
-        self.status = details.get('status', 0)
-        self.naznaka_imena = details.get('tvrtka', {}).get('naznaka_imena', '')
-        self.pravni_oblik = details.get('pravni_oblik', {}).get('vrsta_pravnog_oblika').get('kratica', '')
+        get = details.get
+        djelatnost = get('pretezita_djelatnost') or {}
+        sjediste = get('sjediste') or {}
+        pravni_oblik = (get('pravni_oblik') or {}).get('vrsta_pravnog_oblika') or {}
+
+        self.oib = get('oib')
+        self.djelatnost_sifra = intern_str(djelatnost.get('sifra', ''))
+        self.djelatnost_naziv = intern_str(djelatnost.get('puni_naziv', ''))
+        self.zupanija = intern_str(sjediste.get('naziv_zupanije', ''))
+        self.adresa = f"{sjediste.get('ulica', '')} {sjediste.get('kucni_broj', '')}"
+        self.naselje = intern_str(sjediste.get('naziv_naselja', ''))
+        self.email_adrese = ', '.join([e['adresa'] for e in get('email_adrese') or ()])
+        self.gfi_count = len(get('gfi') or ())
+        self.status = get('status', 0)
+        self.naznaka_imena = (get('tvrtka') or {}).get('naznaka_imena', '')
+        self.pravni_oblik = intern_str(pravni_oblik.get('kratica', ''))
+
+    # whether update_with_values(c) would change anything: only the non-empty values of c count
+    def is_changed_by(self, c: "Company") -> bool:
+        for name in self.MERGED_FIELDS:
+            new = getattr(c, name)
+            if new and new != getattr(self, name):
+                return True
+        return False
 
     def update_with_values(self, c: "Company"):
         if self.mbs != c.mbs:
             raise ValueError("Companies must have the same MBS")
 
-        self.oib = c.oib if c.oib else self.oib
-        self.djelatnost_sifra = c.djelatnost_sifra if c.djelatnost_sifra else self.djelatnost_sifra
-        self.djelatnost_naziv = c.djelatnost_naziv if c.djelatnost_naziv else self.djelatnost_naziv
-        self.zupanija = c.zupanija if c.zupanija else self.zupanija
-        self.adresa = c.adresa if c.adresa else self.adresa
-        self.naselje = c.naselje if c.naselje else self.naselje
-        self.email_adrese = c.email_adrese if c.email_adrese else self.email_adrese
-        self.telefonski_brojevi = c.telefonski_brojevi if c.telefonski_brojevi else self.telefonski_brojevi
-        self.ostalo = c.ostalo if c.ostalo else self.ostalo
-        self.gfi_count = c.gfi_count if c.gfi_count else self.gfi_count
-        self.status = c.status if c.status else self.status
-        self.naznaka_imena = c.naznaka_imena if c.naznaka_imena else self.naznaka_imena
-        self.pravni_oblik = c.pravni_oblik if c.pravni_oblik else self.pravni_oblik
\ No newline at end of file
+        for name in self.MERGED_FIELDS:
+            new = getattr(c, name)
+            if new:
+                setattr(self, name, new)
\ No newline at end of file
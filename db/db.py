@@ -1,55 +1,259 @@
-import json
+import logging
 import os
+import threading
+from typing import Iterable
+from .codec import codec, DECODE_ERRORS
 from .data_models import Company
+from .sqlite_db import SqliteDatabase
+from .name_index import NameIndex
+from .journal import Journal
+from .company_table import CompanyTable
 
 class Database:
+    NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+    COMPACT_MIN_RECORDS = 10000
+
     companies: dict[str, Company] = {}
+    companies_by_oib: dict[str, Company] = {}
+    indexed_oibs: dict[str, str] = {}
+    name_index: NameIndex
+    journal: Journal
     fetch_job_status: dict[str, any] = {}
     file_path: str
     is_dirty: bool = False
+    expected_count: int = 0
+    loaded: threading.Event
+    loader: threading.Thread | None = None
+    load_error: Exception | None = None
 
     def __init__(self, file_path: str):
         self.file_path = file_path
+        self.name_index = NameIndex()
+        self.journal = Journal(f"{file_path}.journal")
+        self.loaded = threading.Event()
         self.load_from_file()
 
+    def is_ndjson(self) -> bool:
+        return self.file_path.endswith(self.NDJSON_EXTENSIONS)
+
+    # a loader that died half way leaves a partial database, saving it would drop the rest
+    def ensure_loaded(self):
+        self.loaded.wait()
+        if self.load_error is not None:
+            raise Exception(f"Greška loading {self.file_path}: {self.load_error}") from self.load_error
+
+    def close(self):
+        self.ensure_loaded()
+        self.journal.close()
+
     def add_company(self, company: Company):
-        if company.mbs in self.companies:
-            c = self.companies[company.mbs]
-            c.update_with_values(company)
-            self.companies[company.mbs] = c
-        else:
-            self.companies[company.mbs] = company
-        self.is_dirty = True
+        self.add_companies((company,))
+
+    # merges a batch in one pass; a company whose new values are already stored is neither
+    # indexed nor journaled again, and the database only turns dirty when something changed
+    def add_companies(self, companies: Iterable[Company]) -> dict[str, int]:
+        self.ensure_loaded()
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        for company in companies:
+            existing = self.companies.get(company.mbs)
+            if existing is None:
+                self.companies[company.mbs] = existing = company
+                counts["added"] += 1
+            # a stored company changed in place can not be compared with itself, it is written again
+            elif existing is company or existing.is_changed_by(company):
+                existing.update_with_values(company)
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            self.index_company(existing)
+            self.journal.append("company", existing.to_row())
+
+        if counts["added"] or counts["updated"]:
+            self.is_dirty = True
+        return counts
+
+    # returns how many of the companies were stored
+    def remove_companies(self, mbs_list: Iterable[str]) -> int:
+        self.ensure_loaded()
+        removed = [mbs for mbs in mbs_list if self.remove_in_memory(mbs)]
+        if removed:
+            self.journal.append("remove", removed)
+            self.is_dirty = True
+        return len(removed)
+
+    def remove_in_memory(self, mbs: str) -> bool:
+        company = self.companies.pop(mbs, None)
+        if company is None:
+            return False
+        indexed_oib = self.indexed_oibs.pop(mbs, None)
+        if indexed_oib is not None and self.companies_by_oib.get(indexed_oib) is company:
+            del self.companies_by_oib[indexed_oib]
+        self.name_index.remove(mbs)
+        return True
+
+    # journal records hold the full merged state, so replaying them is a plain overwrite
+    def apply_journal_record(self, op: str, data):
+        if op == "company":
+            c = Company.from_row(data) if isinstance(data, list) else Company.from_dict(data)
+            self.companies[c.mbs] = c
+            self.index_company(c)
+        elif op == "remove":
+            for mbs in data:
+                self.remove_in_memory(mbs)
+        elif op == "status":
+            self.fetch_job_status = data
+        elif op == "clear":
+            self.clear_in_memory(**data)
+
+    def replay_journal(self):
+        for op, data in self.journal.replay():
+            self.apply_journal_record(op, data)
+
+    # companies can be changed in place before they are re-added, so the indexes remember
+    # what they were built from instead of trusting the current attribute values
+    def index_company(self, company: Company):
+        indexed_oib = self.indexed_oibs.pop(company.mbs, None)
+        if indexed_oib is not None:
+            indexed = self.companies_by_oib.get(indexed_oib)
+            if indexed is not None and indexed.mbs == company.mbs:
+                del self.companies_by_oib[indexed_oib]
+        if company.oib is not None:
+            self.companies_by_oib[company.oib] = company
+            self.indexed_oibs[company.mbs] = company.oib
+
+        self.name_index.add(company.mbs, company.ime)
+
+    def rebuild_indexes(self):
+        self.companies_by_oib = {}
+        self.indexed_oibs = {}
+        self.name_index.clear()
+        for company in self.companies.values():
+            self.index_company(company)
 
     def get_company_my_mbs(self, mbs: str) -> Company:
-        return self.companies.get(mbs)
+        # answered straight away if the record is already in, otherwise after the load finishes
+        company = self.companies.get(mbs)
+        if company is None and not self.loaded.is_set():
+            self.ensure_loaded()
+            company = self.companies.get(mbs)
+        return company
     
     def get_company_by_oib(self, oib: str) -> Company:
-        return next((c for c in self.companies.values() if c.oib == oib), None)
+        self.ensure_loaded()
+        return self.companies_by_oib.get(oib)
 
-    def get_company_list_by_name(self, name: str) -> list[Company]:
-        return [c for c in self.companies.values() if c.ime.lower().find(name.lower()) > -1] if name else []
+    def get_company_list_by_name(self, name: str, prefix: bool = False) -> list[Company]:
+        self.ensure_loaded()
+        return [self.companies[mbs] for mbs in self.name_index.search(name, prefix)] if name else []
     
+    # a save only has to make the journal durable, the snapshot is rewritten once the journal
+    # has grown as large as the database itself
     def save_to_file(self):
-        with open(self.file_path, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        self.ensure_loaded()
+        self.journal.sync()
+        if self.journal.records >= max(self.COMPACT_MIN_RECORDS, len(self.companies)):
+            self.compact()
         self.is_dirty = False
 
+    def compact(self):
+        self.ensure_loaded()
+        self.write_snapshot()
+        self.journal.truncate()
+
+    # written next to the snapshot and renamed over it, so a crash never leaves a truncated file
+    def write_snapshot(self):
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            if self.is_ndjson():
+                self.write_ndjson(f)
+            else:
+                f.write(codec.dumps(self.to_dict()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+
+    # NDJSON layout: a header line with the job status, company count and field order, then one
+    # company per line as an array of values in that order; files with one object per line still load
+    def write_ndjson(self, f):
+        f.write(codec.dumps({"fetch_job_status": self.fetch_job_status, "count": len(self.companies), "fields": Company.FIELDS}))
+        f.write(b"\n")
+        dumps = codec.dumps
+        f.writelines(dumps(c.to_row()) + b"\n" for c in self.companies.values())
+
     def load_from_file(self):
+        # never let a reload race a loader thread that is still running
+        if self.loader:
+            self.loaded.wait()
+        self.loaded.clear()
+        self.load_error = None
         self.companies = {}
         self.fetch_job_status = {}
+        self.expected_count = 0
+        self.rebuild_indexes()
+        self.is_dirty = False
+
+        if self.is_ndjson() and os.path.exists(self.file_path):
+            self.start_ndjson_loader()
+            return
 
         if os.path.exists(self.file_path):
-            with open(self.file_path, 'r') as f:
+            with open(self.file_path, 'rb') as f:
                 # try load
                 try:
-                    self.from_dict(json.load(f))
-                except json.JSONDecodeError as e:
-                    print(f"Error loading companies from file: {e}")
+                    self.from_dict(codec.loads(f.read()))
+                except DECODE_ERRORS as e:
+                    logging.error("Greška loading %s: %s", self.file_path, e)
                     self.companies = {}
-        self.is_dirty = False
+        self.rebuild_indexes()
+        self.replay_journal()
+        self.loaded.set()
+
+    def start_ndjson_loader(self):
+        f = open(self.file_path, 'rb')
+        try:
+            header = codec.loads(f.readline() or b"{}")
+        except DECODE_ERRORS as e:
+            logging.error("Greška loading %s: %s", self.file_path, e)
+            header = {}
+        self.fetch_job_status = header.get('fetch_job_status', {})
+        self.expected_count = header.get('count', 0)
+
+        # rows written in another field order are read as objects
+        fields = tuple(header.get('fields', Company.FIELDS))
+        self.loader = threading.Thread(target=self.load_ndjson_records, args=(f, fields), daemon=True)
+        self.loader.start()
+
+    def load_ndjson_records(self, f, fields: tuple = Company.FIELDS):
+        loads = codec.loads
+        same_fields = fields == Company.FIELDS
+        try:
+            with f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = loads(line)
+                        if isinstance(record, dict):
+                            c = Company.from_dict(record)
+                        elif same_fields:
+                            c = Company.from_row(record)
+                        else:
+                            c = Company.from_dict(dict(zip(fields, record)))
+                    # valid JSON that is neither an object nor a row is skipped like a broken line
+                    except (TypeError, ValueError, *DECODE_ERRORS) as e:
+                        logging.error("Greška loading a company from %s: %s", self.file_path, e)
+                        continue
+                    self.companies[c.mbs] = c
+                    self.index_company(c)
+            self.replay_journal()
+        except Exception as e:
+            self.load_error = e
+        finally:
+            self.loaded.set()
 
     def to_dict(self) -> dict:
+        self.ensure_loaded()
         companies = [d.to_dict() for d in self.companies.values()]
 
         return {
@@ -58,26 +262,49 @@ class Database:
         }
 
     def from_dict(self, data: dict):
-        self.companies = {c['mbs']: Company(**c) for c in data['companies']}
+        self.companies = {c['mbs']: Company.from_dict(c) for c in data['companies']}
         self.fetch_job_status = data.get('fetch_job_status', {})
 
     def get_all_companies(self) -> list[Company]:
+        self.ensure_loaded()
         return list[Company](self.companies.values())
     
+    def iter_companies(self):
+        self.ensure_loaded()
+        yield from self.companies.values()
+
+    def to_table(self) -> CompanyTable:
+        self.ensure_loaded()
+        return CompanyTable.from_companies(self.companies.values())
+
     def count(self) -> int:
+        if not self.loaded.is_set():
+            return max(self.expected_count, len(self.companies))
         return len(self.companies)
 
     def clear(self, companies: bool = False, fetch_job_status: bool = False):
+        self.ensure_loaded()
+        self.clear_in_memory(companies, fetch_job_status)
+        self.journal.append("clear", {"companies": companies, "fetch_job_status": fetch_job_status})
+        self.is_dirty = True
+
+    def clear_in_memory(self, companies: bool = False, fetch_job_status: bool = False):
         if companies:
             self.companies = {}
+            self.rebuild_indexes()
         if fetch_job_status:
             self.fetch_job_status = {}
-        
-        self.is_dirty = True
 
     def set_fetch_job_status(self, status: dict[str, any]):
+        self.ensure_loaded()
         self.fetch_job_status = status
+        self.journal.append("status", status)
         self.is_dirty = True
 
     def get_fetch_job_status(self) -> dict[str, any]:
         return self.fetch_job_status
+
+def open_database(file_path: str) -> Database | SqliteDatabase:
+    if file_path.endswith(SqliteDatabase.EXTENSIONS):
+        return SqliteDatabase(file_path)
+    return Database(file_path)
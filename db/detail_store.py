@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Iterator
+from .codec import codec as json_codec
+
+# zstandard is optional, without it blobs are written with zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class DetailStore:
+    # one SQLite file instead of a JSON file per company; every blob records the codec it was
+    # written with, so the compression setting can change without rewriting old rows
+    NAMESPACES = ("sudreg", "companywall")
+    CODECS = ("zstd", "zlib", "none")
+    COMMIT_EVERY = 100
+    ZSTD_LEVEL = 3
+    ZLIB_LEVEL = 6
+
+    connection: sqlite3.Connection
+    file_path: str
+    compression: str
+    lock: threading.Lock
+    uncommitted: int = 0
+
+    def __init__(self, file_path: str, compression: str = "zstd"):
+        self.file_path = file_path
+        self.compression = compression if compression in self.CODECS else "none"
+        if self.compression == "zstd" and zstandard is None:
+            self.compression = "zlib"
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                namespace TEXT NOT NULL,
+                mbs TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                body BLOB NOT NULL,
+                PRIMARY KEY (namespace, mbs)
+            ) WITHOUT ROWID
+        """)
+
+    def encode(self, details: dict) -> bytes:
+        data = json_codec.dumps(details)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).compress(data)
+        if self.compression == "zlib":
+            return zlib.compress(data, self.ZLIB_LEVEL)
+        return data
+
+    def decode(self, codec: str, body: bytes) -> dict:
+        if codec == "zstd":
+            if zstandard is None:
+                raise Exception("Reading zstd compressed details needs zstandard: pip install zstandard")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif codec == "zlib":
+            body = zlib.decompress(body)
+        return json_codec.loads(body)
+
+    def put(self, namespace: str, mbs, details: dict):
+        body = self.encode(details)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO details (namespace, mbs, codec, body) VALUES (?, ?, ?, ?)",
+                (namespace, str(mbs), self.compression, body))
+            self.uncommitted += 1
+            if self.uncommitted >= self.COMMIT_EVERY:
+                self.connection.commit()
+                self.uncommitted = 0
+
+    def get(self, namespace: str, mbs) -> dict | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT codec, body FROM details WHERE namespace = ? AND mbs = ?", (namespace, str(mbs))).fetchone()
+        return self.decode(*row) if row else None
+
+    def has(self, namespace: str, mbs) -> bool:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM details WHERE namespace = ? AND mbs = ?", (namespace, str(mbs))).fetchone() is not None
+
+    # answered from the primary key alone, one query instead of an exists check per company
+    def fetched_mbs(self, namespace: str) -> set[str]:
+        with self.lock:
+            return {mbs for (mbs,) in self.connection.execute("SELECT mbs FROM details WHERE namespace = ?", (namespace,))}
+
+    def iter_details(self, namespace: str) -> Iterator[tuple[str, dict]]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT mbs, codec, body FROM details WHERE namespace = ? ORDER BY mbs", (namespace,)).fetchall()
+        for mbs, codec, body in rows:
+            yield mbs, self.decode(codec, body)
+
+    def count(self, namespace: str) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM details WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def delete(self, namespace: str, mbs):
+        with self.lock:
+            self.connection.execute("DELETE FROM details WHERE namespace = ? AND mbs = ?", (namespace, str(mbs)))
+            self.uncommitted += 1
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+    # imports a directory of <mbs>.json files as written by the old per-file layout
+    def import_directory(self, namespace: str, directory: str) -> int:
+        count = 0
+        for filename in sorted(os.listdir(directory)):
+            mbs, extension = os.path.splitext(filename)
+            if extension != ".json":
+                continue
+            with open(os.path.join(directory, filename), 'r') as f:
+                try:
+                    details = json.load(f)
+                except json.JSONDecodeError as e:
+                    logging.error("Greška loading %s: %s", filename, e)
+                    continue
+            self.put(namespace, mbs, details)
+            count += 1
+        self.commit()
+        return count
@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+class JobState:
+    # progress of the harvest stages (list, details, companywall): a checkpoint per stage and a
+    # status per item, written in SQLite transactions so a crash never leaves half a checkpoint
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    COMMIT_EVERY = 100
+
+    connection: sqlite3.Connection
+    file_path: str
+    max_retries: int
+    lock: threading.Lock
+    uncommitted: int = 0
+
+    def __init__(self, file_path: str, max_retries: int = 3):
+        self.file_path = file_path
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS stages (
+                stage TEXT PRIMARY KEY,
+                checkpoint TEXT,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                retries INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (stage, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS items_status ON items (stage, status);
+        """)
+
+    # stored next to the company database, data/companies.json -> data/companies.jobs.sqlite
+    @staticmethod
+    def get_default_path(db_file_path: str) -> str:
+        return f"{os.path.splitext(db_file_path)[0]}.jobs.sqlite"
+
+    def get_checkpoint(self, stage: str) -> dict:
+        with self.lock:
+            row = self.connection.execute("SELECT checkpoint FROM stages WHERE stage = ?", (stage,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    # checkpoints are committed straight away together with every item update before them
+    def set_checkpoint(self, stage: str, checkpoint: dict):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO stages (stage, checkpoint, updated_at) VALUES (?, ?, ?)",
+                (stage, json.dumps(checkpoint), time.time()))
+            self.connection.commit()
+            self.uncommitted = 0
+
+    # new keys start as pending, keys the stage already knows keep their status
+    def enqueue(self, stage: str, keys: Iterable):
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO items (stage, key, status, updated_at) VALUES (?, ?, ?, ?)",
+                ((stage, str(key), self.PENDING, now) for key in keys))
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def mark_done(self, stage: str, key):
+        self.write(
+            "INSERT INTO items (stage, key, status, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (stage, key) DO UPDATE SET status = excluded.status, error = NULL, updated_at = excluded.updated_at",
+            (stage, str(key), self.DONE, time.time()))
+
+    def mark_failed(self, stage: str, key, error: str):
+        self.write(
+            "INSERT INTO items (stage, key, status, retries, error, updated_at) VALUES (?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (stage, key) DO UPDATE SET status = excluded.status, retries = retries + 1, error = excluded.error, updated_at = excluded.updated_at",
+            (stage, str(key), self.FAILED, error, time.time()))
+
+    def write(self, sql: str, params: tuple):
+        with self.lock:
+            self.connection.execute(sql, params)
+            self.uncommitted += 1
+            if self.uncommitted >= self.COMMIT_EVERY:
+                self.connection.commit()
+                self.uncommitted = 0
+
+    def done_keys(self, stage: str) -> set[str]:
+        return self.keys(stage, "status = ?", (self.DONE,))
+
+    # failed items that still have retries left
+    def retry_keys(self, stage: str) -> set[str]:
+        return self.keys(stage, "status = ? AND retries < ?", (self.FAILED, self.max_retries))
+
+    # failed items that ran out of retries, they are only fetched again on request
+    def exhausted_keys(self, stage: str) -> set[str]:
+        return self.keys(stage, "status = ? AND retries >= ?", (self.FAILED, self.max_retries))
+
+    def keys(self, stage: str, condition: str, params: tuple) -> set[str]:
+        with self.lock:
+            return {key for (key,) in self.connection.execute(f"SELECT key FROM items WHERE stage = ? AND {condition}", (stage,) + params)}
+
+    def counts(self, stage: str) -> dict[str, int]:
+        with self.lock:
+            rows = self.connection.execute("SELECT status, COUNT(*) FROM items WHERE stage = ? GROUP BY status", (stage,)).fetchall()
+        return {status: count for status, count in rows}
+
+    def get_errors(self, stage: str) -> dict[str, str]:
+        with self.lock:
+            rows = self.connection.execute("SELECT key, error FROM items WHERE stage = ? AND status = ?", (stage, self.FAILED)).fetchall()
+        return dict(rows)
+
+    def reset(self, stage: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM items WHERE stage = ?", (stage,))
+            self.connection.execute("DELETE FROM stages WHERE stage = ?", (stage,))
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,67 @@
+import logging
+import os
+from .codec import codec, DECODE_ERRORS
+
+class Journal:
+    file_path: str
+    fsync_every: int
+    records: int
+    unsynced: int
+
+    def __init__(self, file_path: str, fsync_every: int = 1000):
+        self.file_path = file_path
+        self.fsync_every = fsync_every
+        self.records = 0
+        self.unsynced = 0
+        self.f = None
+
+    def append(self, op: str, data):
+        if self.f is None:
+            self.f = open(self.file_path, 'ab')
+
+        self.f.write(codec.dumps({"op": op, "data": data}) + b"\n")
+        self.records += 1
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self.f is None or self.unsynced == 0:
+            return
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.unsynced = 0
+
+    def replay(self):
+        self.records = 0
+        if not os.path.exists(self.file_path):
+            return
+
+        valid_size = 0
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = codec.loads(line)
+                except DECODE_ERRORS:
+                    # a crash mid-append leaves a partial last line, everything before it is intact
+                    logging.warning("Dropping incomplete journal record in %s", self.file_path)
+                    break
+                valid_size += len(line)
+                self.records += 1
+                yield record["op"], record["data"]
+
+        # cut the partial record off, otherwise the next append would land behind it
+        if valid_size < os.path.getsize(self.file_path):
+            os.truncate(self.file_path, valid_size)
+
+    def truncate(self):
+        self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        self.records = 0
+
+    def close(self):
+        if self.f is not None:
+            self.sync()
+            self.f.close()
+            self.f = None
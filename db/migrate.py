@@ -0,0 +1,38 @@
+import sys
+from .db import open_database
+from .detail_store import DetailStore
+
+def migrate_database(source_path: str, target_path: str) -> int:
+    source = open_database(source_path)
+    target = open_database(target_path)
+
+    for company in source.get_all_companies():
+        target.add_company(company)
+    target.set_fetch_job_status(source.get_fetch_job_status())
+    target.compact()
+    target.close()
+
+    return source.count()
+
+# packs a directory of <mbs>.json detail files into the detail store, the files are left in place
+def migrate_details(source_dir: str, store_path: str, namespace: str, compression: str = "zstd") -> int:
+    store = DetailStore(store_path, compression)
+    count = store.import_directory(namespace, source_dir)
+    store.close()
+    return count
+
+# python -m db.migrate data/companies.json data/companies.sqlite (or .ndjson), the backend follows the extension
+# python -m db.migrate details data/details data/details.sqlite sudreg (or data/companywall ... companywall)
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "details":
+        count = migrate_details(sys.argv[2], sys.argv[3], sys.argv[4])
+        print(f"Migrated {count} {sys.argv[4]} details to {sys.argv[3]}")
+        sys.exit(0)
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m db.migrate <source> <target>")
+        print("       python -m db.migrate details <source_dir> <store> <sudreg|companywall>")
+        sys.exit(1)
+
+    count = migrate_database(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} companies to {sys.argv[2]}")
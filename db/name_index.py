@@ -0,0 +1,85 @@
+class NameIndex:
+    # token -> keys inverted index over lowercased names, with a trigram index over the
+    # token vocabulary so substring queries only have to look at a handful of tokens
+    GRAM = 3
+
+    names: dict[any, str]
+    tokens: dict[str, set]
+    token_grams: dict[str, set[str]]
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.names = {}
+        self.tokens = {}
+        self.token_grams = {}
+
+    def add(self, key, name: str | None):
+        name = name.lower() if name else ""
+        if self.names.get(key) == name:
+            return
+
+        self.remove(key)
+        self.names[key] = name
+        for token in set(name.split()):
+            keys = self.tokens.get(token)
+            if keys is None:
+                keys = self.tokens[token] = set()
+                for gram in self.grams(token):
+                    self.token_grams.setdefault(gram, set()).add(token)
+            keys.add(key)
+
+    def remove(self, key):
+        name = self.names.pop(key, None)
+        if name is None:
+            return
+
+        for token in set(name.split()):
+            keys = self.tokens.get(token)
+            keys.discard(key)
+            if keys:
+                continue
+
+            del self.tokens[token]
+            for gram in self.grams(token):
+                grams = self.token_grams[gram]
+                grams.discard(token)
+                if not grams:
+                    del self.token_grams[gram]
+
+    def search(self, query: str, prefix: bool = False) -> list:
+        query = query.lower() if query else ""
+        query_tokens = query.split()
+        if not query_tokens:
+            return []
+
+        # every whitespace separated part of the query is a substring of some token of a matching name
+        candidates = None
+        for query_token in sorted(query_tokens, key=len, reverse=True):
+            keys = set()
+            for token in self.matching_tokens(query_token):
+                keys |= self.tokens[token]
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return []
+
+        if prefix:
+            return [k for k in candidates if self.names[k].startswith(query)]
+        return [k for k in candidates if query in self.names[k]]
+
+    def matching_tokens(self, query_token: str) -> list[str]:
+        if len(query_token) < self.GRAM:
+            return [t for t in self.tokens if query_token in t]
+
+        tokens = None
+        for gram in self.grams(query_token):
+            grams = self.token_grams.get(gram)
+            if not grams:
+                return []
+            tokens = set(grams) if tokens is None else tokens & grams
+
+        return [t for t in tokens if query_token in t]
+
+    def grams(self, token: str) -> set[str]:
+        return {token[i:i + self.GRAM] for i in range(len(token) - self.GRAM + 1)}
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import threading
+import time
+
+class ProfileIndex:
+    # OIB -> CompanyWall profile href, so a refresh can skip the search page
+    connection: sqlite3.Connection
+    file_path: str
+    lock: threading.Lock
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(file_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                oib TEXT PRIMARY KEY,
+                href TEXT NOT NULL,
+                updated_at REAL
+            )
+        """)
+
+    # stored next to the company database, data/companies.json -> data/companies.profiles.sqlite
+    @staticmethod
+    def get_default_path(db_file_path: str) -> str:
+        return f"{os.path.splitext(db_file_path)[0]}.profiles.sqlite"
+
+    def get(self, oib: str) -> str | None:
+        with self.lock:
+            row = self.connection.execute("SELECT href FROM profiles WHERE oib = ?", (str(oib),)).fetchone()
+        return row[0] if row else None
+
+    def put(self, oib: str, href: str):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO profiles (oib, href, updated_at) VALUES (?, ?, ?)", (str(oib), href, time.time()))
+            self.connection.commit()
+
+    def delete(self, oib: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM profiles WHERE oib = ?", (str(oib),))
+            self.connection.commit()
+
+    def hrefs(self) -> set[str]:
+        with self.lock:
+            return {href for (href,) in self.connection.execute("SELECT href FROM profiles")}
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import time
+
+class ShardCoordinator:
+    # hands out ranges of list offsets to harvesting processes through a shared SQLite file;
+    # the length of the listing is not known up front, so shards are created on demand until one
+    # of them reaches the end, and a shard whose lease runs out is handed to the next process
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+
+    connection: sqlite3.Connection
+    file_path: str
+    shard_size: int
+    lease_seconds: float
+
+    def __init__(self, file_path: str, shard_size: int = 10000, lease_seconds: float = 600):
+        self.file_path = file_path
+        self.shard_size = shard_size
+        self.lease_seconds = lease_seconds
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(file_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS shards (
+                start INTEGER PRIMARY KEY,
+                stop INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                expires_at REAL,
+                rows INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            );
+        """)
+
+    def get_end(self) -> int | None:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'end'").fetchone()
+        return row[0] if row else None
+
+    # returns (start, stop) of the shard now leased to owner, None when the listing is done
+    def acquire(self, owner: str) -> tuple[int, int] | None:
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            end = self.get_end()
+            row = self.connection.execute(
+                "SELECT start, stop FROM shards WHERE (status = ? OR (status = ? AND expires_at < ?)) AND (? IS NULL OR start < ?) "
+                "ORDER BY start LIMIT 1",
+                (self.PENDING, self.LEASED, now, end, end)).fetchone()
+
+            if row is None:
+                if end is not None:
+                    self.connection.execute("COMMIT")
+                    return None
+                start = self.connection.execute("SELECT COALESCE(MAX(stop), 0) FROM shards").fetchone()[0]
+                row = (start, start + self.shard_size)
+                self.connection.execute(
+                    "INSERT INTO shards (start, stop, status) VALUES (?, ?, ?)", (row[0], row[1], self.PENDING))
+
+            self.connection.execute(
+                "UPDATE shards SET status = ?, owner = ?, expires_at = ?, attempts = attempts + 1 WHERE start = ?",
+                (self.LEASED, owner, now + self.lease_seconds, row[0]))
+            self.connection.execute("COMMIT")
+            return row
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    # extends the lease, False when the shard was meanwhile handed to someone else
+    def renew(self, start: int, owner: str) -> bool:
+        cursor = self.connection.execute(
+            "UPDATE shards SET expires_at = ? WHERE start = ? AND owner = ? AND status = ?",
+            (time.time() + self.lease_seconds, start, owner, self.LEASED))
+        return cursor.rowcount == 1
+
+    # end_reached: the listing ended inside this shard, after start + rows;
+    # False when the lease ran out and the shard was handed to someone else in the meantime
+    def complete(self, start: int, owner: str, rows: int, end_reached: bool) -> bool:
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.connection.execute(
+                "UPDATE shards SET status = ?, rows = ?, expires_at = NULL WHERE start = ? AND owner = ?",
+                (self.DONE, rows, start, owner))
+            if cursor.rowcount == 0:
+                self.connection.execute("COMMIT")
+                return False
+            if end_reached:
+                end = start + rows
+                current = self.get_end()
+                if current is None or end < current:
+                    self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('end', ?)", (end,))
+            self.connection.execute("COMMIT")
+            return True
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def release(self, start: int, owner: str):
+        self.connection.execute(
+            "UPDATE shards SET status = ?, owner = NULL, expires_at = NULL WHERE start = ? AND owner = ?",
+            (self.PENDING, start, owner))
+
+    def counts(self) -> dict[str, int]:
+        rows = self.connection.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def is_finished(self) -> bool:
+        end = self.get_end()
+        if end is None:
+            return False
+        open_shards = self.connection.execute(
+            "SELECT COUNT(*) FROM shards WHERE status != ? AND start < ?", (self.DONE, end)).fetchone()[0]
+        return open_shards == 0
+
+    def reset(self):
+        self.connection.execute("DELETE FROM shards")
+        self.connection.execute("DELETE FROM meta")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,201 @@
+import json
+import sqlite3
+from typing import Iterable
+from .data_models import Company
+from .company_table import CompanyTable
+
+class SqliteDatabase:
+    EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+    COLUMNS = list(Company.FIELDS)
+    JSON_COLUMNS = ("email_adrese", "telefonski_brojevi", "ostalo")
+    # stays well below the bound parameter limit of older SQLite builds
+    LOOKUP_BATCH = 500
+
+    connection: sqlite3.Connection
+    file_path: str
+    is_dirty: bool = False
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.load_from_file()
+
+    def create_schema(self):
+        # mbs and oib are declared without a type so they keep whatever type the API returned,
+        # exactly like the keys of the JSON database
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS companies (
+                mbs PRIMARY KEY,
+                ime TEXT,
+                ime_lower TEXT,
+                oib,
+                djelatnost_sifra TEXT,
+                djelatnost_naziv TEXT,
+                zupanija TEXT,
+                adresa TEXT,
+                naselje TEXT,
+                email_adrese TEXT,
+                telefonski_brojevi TEXT,
+                ostalo TEXT,
+                gfi_count INTEGER,
+                status INTEGER,
+                naznaka_imena TEXT,
+                pravni_oblik TEXT
+            );
+            CREATE INDEX IF NOT EXISTS companies_oib ON companies (oib);
+            CREATE INDEX IF NOT EXISTS companies_ime_lower ON companies (ime_lower);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def load_from_file(self):
+        self.connection = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_schema()
+        self.is_dirty = False
+
+    def close(self):
+        self.connection.close()
+
+    def add_company(self, company: Company):
+        self.add_companies((company,))
+
+    # looks the stored rows of the whole batch up at once and writes only the companies that
+    # were added or changed, in one executemany
+    def add_companies(self, companies: Iterable[Company]) -> dict[str, int]:
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        companies = list(companies)
+        stored = self.get_companies_by_mbs([c.mbs for c in companies])
+        changed: dict[str, Company] = {}
+
+        for company in companies:
+            existing = stored.get(company.mbs)
+            if existing is None:
+                stored[company.mbs] = existing = company
+                counts["added"] += 1
+            elif existing.is_changed_by(company):
+                existing.update_with_values(company)
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            changed[existing.mbs] = existing
+
+        if changed:
+            self.upsert_companies(changed.values())
+            self.is_dirty = True
+        return counts
+
+    def upsert_company(self, company: Company):
+        self.upsert_companies((company,))
+
+    def upsert_companies(self, companies: Iterable[Company]):
+        columns = self.COLUMNS + ["ime_lower"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+
+        self.connection.executemany(
+            f"INSERT INTO companies ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (mbs) DO UPDATE SET {updates}",
+            (self.to_row(c) + [c.ime.lower() if c.ime else None] for c in companies))
+
+    # returns how many of the companies were stored
+    def remove_companies(self, mbs_list: Iterable[str]) -> int:
+        mbs_list = list(mbs_list)
+        removed = 0
+        for i in range(0, len(mbs_list), self.LOOKUP_BATCH):
+            batch = mbs_list[i:i + self.LOOKUP_BATCH]
+            removed += self.connection.execute(f"DELETE FROM companies WHERE mbs IN ({', '.join('?' * len(batch))})", tuple(batch)).rowcount
+        if removed:
+            self.is_dirty = True
+        return removed
+
+    def get_company_my_mbs(self, mbs: str) -> Company:
+        return self.query_one("WHERE mbs = ?", (mbs,))
+
+    def get_companies_by_mbs(self, mbs_list: list) -> dict[str, Company]:
+        companies = {}
+        for i in range(0, len(mbs_list), self.LOOKUP_BATCH):
+            batch = mbs_list[i:i + self.LOOKUP_BATCH]
+            for c in self.query(f"WHERE mbs IN ({', '.join('?' * len(batch))})", tuple(batch)):
+                companies[c.mbs] = c
+        return companies
+
+    def get_company_by_oib(self, oib: str) -> Company:
+        return self.query_one("WHERE oib = ?", (oib,))
+
+    def get_company_list_by_name(self, name: str, prefix: bool = False) -> list[Company]:
+        if not name:
+            return []
+        if prefix:
+            # a range scan on ime_lower can use the index, LIKE 'x%' can not
+            return self.query("WHERE ime_lower >= ? AND ime_lower < ?", (name.lower(), name.lower() + "\U0010ffff"))
+        pattern = name.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return self.query("WHERE ime_lower LIKE ? ESCAPE '\\'", (f"%{pattern}%",))
+
+    def save_to_file(self):
+        self.connection.commit()
+        self.is_dirty = False
+
+    def compact(self):
+        self.save_to_file()
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def to_dict(self) -> dict:
+        return {
+            "companies": [c.to_dict() for c in self.get_all_companies()],
+            "fetch_job_status": self.get_fetch_job_status()
+        }
+
+    def get_all_companies(self) -> list[Company]:
+        return self.query()
+
+    # rows are decoded one at a time from the cursor, in rowid order so exports can resume
+    def iter_companies(self):
+        cursor = self.connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM companies ORDER BY rowid")
+        for row in cursor:
+            yield self.from_row(row)
+
+    def to_table(self) -> CompanyTable:
+        return CompanyTable.from_companies(self.query())
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def clear(self, companies: bool = False, fetch_job_status: bool = False):
+        if companies:
+            self.connection.execute("DELETE FROM companies")
+        if fetch_job_status:
+            self.connection.execute("DELETE FROM meta WHERE key = 'fetch_job_status'")
+
+        self.is_dirty = True
+
+    def set_fetch_job_status(self, status: dict[str, any]):
+        self.connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('fetch_job_status', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (json.dumps(status),))
+        self.is_dirty = True
+
+    def get_fetch_job_status(self) -> dict[str, any]:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'fetch_job_status'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def query(self, where: str = "", params: tuple = ()) -> list[Company]:
+        cursor = self.connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM companies {where}", params)
+        return [self.from_row(row) for row in cursor]
+
+    def query_one(self, where: str, params: tuple) -> Company | None:
+        row = self.connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM companies {where} LIMIT 1", params).fetchone()
+        return self.from_row(row) if row else None
+
+    def to_row(self, company: Company) -> list:
+        data = company.to_dict()
+        return [json.dumps(data[c]) if c in self.JSON_COLUMNS and data[c] is not None else data[c] for c in self.COLUMNS]
+
+    def from_row(self, row: tuple) -> Company:
+        data = dict(zip(self.COLUMNS, row))
+        for c in self.JSON_COLUMNS:
+            if data[c] is not None:
+                data[c] = json.loads(data[c])
+        return Company.from_dict(data)
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+class SyncState:
+    # per-MBS fingerprint of the last seen company list row, plus the time of the last sync
+    file_path: str
+    fingerprints: dict[str, str]
+    last_sync: str | None
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.load_from_file()
+
+    @staticmethod
+    def fingerprint(row: dict) -> str:
+        encoded = json.dumps(row, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def load_from_file(self):
+        self.fingerprints = {}
+        self.last_sync = None
+        if not os.path.exists(self.file_path):
+            return
+
+        with open(self.file_path, 'r') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                logging.error("Greška loading sync state from %s: %s", self.file_path, e)
+                return
+        self.fingerprints = data.get('fingerprints', {})
+        self.last_sync = data.get('last_sync')
+
+    def save_to_file(self):
+        self.last_sync = datetime.now(timezone.utc).isoformat()
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"last_sync": self.last_sync, "fingerprints": self.fingerprints}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
@@ -0,0 +1,20 @@
+from .registry import Registry, Histogram, StageProgress
+from .exporters import MetricsServer, JsonDumper
+
+# the registry the api clients, services and databases report to
+registry = Registry()
+
+# starts the exporters enabled in the config, returns them so the caller can close them
+def start_exporters(config) -> list:
+    exporters = []
+    if config.metrics_port:
+        exporters.append(MetricsServer(registry, config.metrics_port))
+    if config.metrics_dump_path:
+        exporters.append(JsonDumper(registry, config.metrics_dump_path, config.metrics_dump_interval))
+    return exporters
+
+def close_exporters(exporters: list):
+    for exporter in exporters:
+        exporter.close()
+
+__all__ = ["Registry", "Histogram", "StageProgress", "MetricsServer", "JsonDumper", "registry", "start_exporters", "close_exporters"]
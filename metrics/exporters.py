@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .registry import Registry
+
+class MetricsServer:
+    # GET /metrics in the Prometheus text format, GET /metrics.json for the same data as JSON
+    registry: Registry
+    server: ThreadingHTTPServer
+    thread: threading.Thread
+
+    def __init__(self, registry: Registry, port: int, host: str = "127.0.0.1"):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path == "/metrics":
+                    body, content_type = registry.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+                elif handler.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot()).encode("utf-8"), "application/json"
+                else:
+                    handler.send_error(404)
+                    return
+                handler.send_response(200)
+                handler.send_header("Content-Type", content_type)
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class JsonDumper:
+    # rewrites file_path with a registry snapshot every interval seconds and once more on close
+    registry: Registry
+    file_path: str
+    interval: float
+    stopped: threading.Event
+    thread: threading.Thread
+
+    def __init__(self, registry: Registry, file_path: str, interval: float = 30):
+        self.registry = registry
+        self.file_path = file_path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.registry.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.file_path)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.dump()
@@ -0,0 +1,160 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+def format_labels(labels: tuple) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+class Histogram:
+    # geometric buckets from 50µs to about 2 minutes; percentiles are interpolated inside a bucket,
+    # which keeps every observation O(log buckets) and the memory fixed however long the run
+    BOUNDS = [0.00005 * 1.25 ** i for i in range(67)]
+
+    counts: list[int]
+    count: int
+    sum: float
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.BOUNDS[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+class StageProgress:
+    # items/sec since the stage started and the ETA for the rest, when the total is known
+    started_at: float
+    done: int
+    total: int | None
+
+    def __init__(self, total: int | None = None):
+        self.started_at = time.monotonic()
+        self.done = 0
+        self.total = total
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> float | None:
+        rate = self.rate()
+        if self.total is None or rate == 0:
+            return None
+        return max(0, self.total - self.done) / rate
+
+    def summary(self) -> dict:
+        eta = self.eta()
+        return {"done": self.done, "total": self.total, "items_per_second": round(self.rate(), 2), "eta_seconds": round(eta) if eta is not None else None}
+
+class Registry:
+    # process wide counters, latency histograms and stage progress, safe to use from worker threads
+    histograms: dict[tuple, Histogram]
+    counters: dict[tuple, float]
+    stages: dict[str, StageProgress]
+    lock: threading.Lock
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def start_stage(self, stage: str, total: int | None = None) -> StageProgress:
+        with self.lock:
+            self.stages[stage] = StageProgress(total)
+            return self.stages[stage]
+
+    def advance_stage(self, stage: str, count: int = 1):
+        with self.lock:
+            progress = self.stages.get(stage)
+            if progress is None:
+                progress = self.stages[stage] = StageProgress()
+            progress.done += count
+        self.inc("items_total", count, stage=stage)
+
+    def get_stage(self, stage: str) -> StageProgress | None:
+        return self.stages.get(stage)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.stages = {}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "time": round(time.time(), 3),
+                "histograms": [{"name": name, "labels": dict(labels), **h.summary()} for (name, labels), h in self.histograms.items()],
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+                "stages": {stage: p.summary() for stage, p in self.stages.items()},
+            }
+
+    # Prometheus text exposition format 0.0.4
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(Histogram.BOUNDS, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', f'{bound:.6g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{format_labels(labels)} {value}")
+            for stage, progress in sorted(self.stages.items()):
+                labels = (("stage", stage),)
+                lines.append(f"stage_items_per_second{format_labels(labels)} {progress.rate()}")
+                eta = progress.eta()
+                if eta is not None:
+                    lines.append(f"stage_eta_seconds{format_labels(labels)} {eta}")
+        return "\n".join(lines) + "\n"
@@ -1,3 +1,7 @@
 from .sudreg_service import SudregService
+from .csv_export import CsvExport
+from .company_filter import CompanyFilter
+from .progress import ConsoleProgress, JsonProgress
+from .pipeline import HarvestPipeline
 
-__all__ = ["SudregService"]
+__all__ = ["SudregService", "CsvExport", "CompanyFilter", "ConsoleProgress", "JsonProgress", "HarvestPipeline"]
@@ -0,0 +1,168 @@
+import re
+from bisect import bisect_right
+from itertools import islice
+from typing import Iterable
+
+from db import Company, CompanyTable
+
+class CompanyFilter:
+    # A filter spec is a comma separated list of terms, compiled once and applied a whole page
+    # or column at a time:
+    #   zagreb           name contains "zagreb" (case insensitive), any include term may match
+    #   -stečaj          name must not contain "stečaj"
+    #   re:^[A-Z]+\b     name matches the regular expression, -re:... excludes
+    #   status!=4        field predicate, also = and ^= (prefix), on any Company field
+    #   has:email        at least one email address, -has:email for none; also has:oib, has:phone
+    #                    and has:<Company field>, any other name is rejected by parse
+    FIELD_PREDICATE = re.compile(r"^(\w+)\s*(!=|\^=|=)\s*(.*)$")
+    HAS_FIELDS = {"email": "email_adrese", "oib": "oib", "phone": "telefonski_brojevi"}
+
+    include: "NameMatcher"
+    exclude: "NameMatcher"
+    predicates: list[tuple[str, str, str]]
+    has: list[tuple[str, bool]]
+
+    def __init__(self, include_terms: list[str] | None = None, exclude_terms: list[str] | None = None, predicates: list[tuple[str, str, str]] | None = None, has: list[tuple[str, bool]] | None = None):
+        self.include = NameMatcher(include_terms or [])
+        self.exclude = NameMatcher(exclude_terms or [])
+        self.predicates = predicates or []
+        self.has = has or []
+
+    @classmethod
+    def parse(cls, spec: str | list[str] | None, negate: bool = False) -> "CompanyFilter":
+        include_terms, exclude_terms, predicates, has = [], [], [], []
+
+        terms = spec if isinstance(spec, list) else (spec or "").split(",")
+        for term in (t.strip() for t in terms):
+            if not term:
+                continue
+            excluded = negate
+            if term.startswith("-"):
+                excluded, term = not excluded, term[1:]
+
+            match = cls.FIELD_PREDICATE.match(term)
+            if term.startswith("has:"):
+                field = cls.HAS_FIELDS.get(term[4:], term[4:])
+                # checked here, an unknown field would otherwise only fail half way through an export
+                if field not in Company.FIELDS:
+                    raise ValueError(f"Unknown field in {term}, use {', '.join(cls.HAS_FIELDS)} or a Company field")
+                has.append((field, not excluded))
+            elif match and match.group(1) in Company.FIELDS:
+                field, op, value = match.groups()
+                if excluded:
+                    op = {"=": "!=", "!=": "="}.get(op, "!" + op)
+                predicates.append((field, op, value))
+            else:
+                (exclude_terms if excluded else include_terms).append(term)
+
+        return cls(include_terms, exclude_terms, predicates, has)
+
+    # company_filter holds include terms, company_filter_out exclude terms
+    @classmethod
+    def from_config(cls, config) -> "CompanyFilter":
+        include = cls.parse(config.company_filter)
+        exclude = cls.parse(config.company_filter_out, negate=True)
+        return cls.combine(include, exclude)
+
+    @classmethod
+    def combine(cls, *filters: "CompanyFilter") -> "CompanyFilter":
+        return cls(
+            [t for f in filters for t in f.include.terms],
+            [t for f in filters for t in f.exclude.terms],
+            [p for f in filters for p in f.predicates],
+            [h for f in filters for h in f.has],
+        )
+
+    def fields(self) -> set[str]:
+        fields = {field for field, _, _ in self.predicates} | {field for field, _ in self.has}
+        if self.include.terms or self.exclude.terms:
+            fields.add("ime")
+        return fields
+
+    # columns maps field name -> list of values, all lists have the same length
+    def mask_columns(self, columns: dict[str, list], count: int) -> list[bool]:
+        mask = [True] * count
+        if self.include.terms or self.exclude.terms:
+            text, starts = NameMatcher.join(columns["ime"])
+            if self.include.terms:
+                mask = self.include.search(text, starts)
+            if self.exclude.terms:
+                mask = [m and not hit for m, hit in zip(mask, self.exclude.search(text, starts))]
+
+        for field, op, expected in self.predicates:
+            values = columns[field]
+            if op == "=":
+                mask = [m and str(v) == expected for m, v in zip(mask, values)]
+            elif op == "!=":
+                mask = [m and str(v) != expected for m, v in zip(mask, values)]
+            elif op == "^=":
+                mask = [m and v is not None and str(v).startswith(expected) for m, v in zip(mask, values)]
+            elif op == "!^=":
+                mask = [m and not (v is not None and str(v).startswith(expected)) for m, v in zip(mask, values)]
+
+        for field, present in self.has:
+            mask = [m and bool(v) == present for m, v in zip(mask, columns[field])]
+        return mask
+
+    def filter_rows(self, rows: list[dict]) -> list[dict]:
+        columns = {field: [r.get(field) for r in rows] for field in self.fields()}
+        return [r for r, keep in zip(rows, self.mask_columns(columns, len(rows))) if keep]
+
+    def filter_table(self, table: CompanyTable) -> CompanyTable:
+        return table.select(self.mask_columns(table.columns, len(table)))
+
+    def filter_companies(self, companies: Iterable[Company], batch_size: int = 1000):
+        companies = iter(companies)
+        fields = self.fields()
+        while True:
+            batch = list(islice(companies, batch_size))
+            if not batch:
+                return
+            columns = {field: [getattr(c, field) for c in batch] for field in fields}
+            yield from (c for c, keep in zip(batch, self.mask_columns(columns, len(batch))) if keep)
+
+
+class NameMatcher:
+    # literal terms are looked up with str.find over the lowered names of a whole batch joined
+    # by newlines, regex terms (re: prefix) are compiled into a single alternation; after a hit
+    # the scan jumps to the next name, so names that already matched are not searched again
+    terms: list[str]
+    literals: list[str]
+    pattern: re.Pattern | None
+
+    def __init__(self, terms: list[str]):
+        self.terms = terms
+        self.literals = [t.lower() for t in terms if not t.startswith("re:")]
+        patterns = [f"(?:{t[3:]})" for t in terms if t.startswith("re:")]
+        self.pattern = re.compile("|".join(patterns), re.IGNORECASE | re.MULTILINE) if patterns else None
+
+    @staticmethod
+    def join(names: list[str | None]) -> tuple[str, list[int]]:
+        lowered = [n.lower().replace("\n", " ") if n else "" for n in names]
+        starts = []
+        position = 0
+        for n in lowered:
+            starts.append(position)
+            position += len(n) + 1
+        return "\n".join(lowered), starts
+
+    def search(self, text: str, starts: list[int]) -> list[bool]:
+        hits = [False] * len(starts)
+        for literal in self.literals:
+            self.mark(hits, starts, lambda position: text.find(literal, position))
+        if self.pattern:
+            self.mark(hits, starts, lambda position: self.search_pattern(text, position))
+        return hits
+
+    def search_pattern(self, text: str, position: int) -> int:
+        match = self.pattern.search(text, position)
+        return match.start() if match else -1
+
+    def mark(self, hits: list[bool], starts: list[int], find):
+        position = find(0)
+        while position != -1:
+            i = bisect_right(starts, position) - 1
+            hits[i] = True
+            if i + 1 >= len(starts):
+                return
+            position = find(starts[i + 1])
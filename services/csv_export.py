@@ -0,0 +1,108 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+class CsvExport:
+    # streams rows into a (optionally gzipped) CSV file and records a checkpoint every
+    # CHECKPOINT_EVERY rows. For gzip output every checkpoint also closes the current gzip
+    # member, so a resumed export can cut the file back to the checkpoint and append a new one.
+    CHECKPOINT_EVERY = 10000
+
+    file_path: str
+    checkpoint_path: str
+    header: list[str]
+    resume: bool
+    rows: int
+
+    def __init__(self, file_path: str, header: list[str], resume: bool = False):
+        self.file_path = file_path
+        self.checkpoint_path = f"{file_path}.checkpoint"
+        self.header = header
+        self.resume = resume
+        self.rows = 0
+        self.raw = None
+        self.stream = None
+        self.text = None
+        self.writer = None
+
+    def __enter__(self) -> "CsvExport":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            # keep the last checkpoint so the export can be resumed
+            self.close()
+
+    def is_gzip(self) -> bool:
+        return self.file_path.endswith(".gz")
+
+    def open(self):
+        checkpoint = self.load_checkpoint() if self.resume else None
+        if checkpoint and os.path.exists(self.file_path):
+            self.raw = open(self.file_path, 'r+b')
+            self.raw.truncate(checkpoint['bytes'])
+            self.raw.seek(0, os.SEEK_END)
+            self.rows = checkpoint['rows']
+            self.start_segment()
+        else:
+            self.raw = open(self.file_path, 'wb')
+            self.rows = 0
+            self.start_segment()
+            self.writer.writerow(self.header)
+
+    def writerow(self, row: list):
+        self.writer.writerow(row)
+        self.rows += 1
+        if self.rows % self.CHECKPOINT_EVERY == 0:
+            self.checkpoint()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def checkpoint(self):
+        self.end_segment()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"rows": self.rows, "bytes": self.raw.tell()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+        self.start_segment()
+
+    def load_checkpoint(self) -> dict | None:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, 'r') as f:
+            return json.load(f)
+
+    def has_checkpoint(self) -> bool:
+        return os.path.exists(self.checkpoint_path)
+
+    def start_segment(self):
+        self.stream = gzip.GzipFile(fileobj=self.raw, mode='wb') if self.is_gzip() else self.raw
+        self.text = io.TextIOWrapper(self.stream, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+
+    def end_segment(self):
+        self.text.flush()
+        self.text.detach()
+        if self.stream is not self.raw:
+            # closing a GzipFile writes the member trailer but leaves the underlying file open
+            self.stream.close()
+
+    def finish(self):
+        self.close()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def close(self):
+        self.end_segment()
+        self.raw.close()
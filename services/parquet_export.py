@@ -0,0 +1,154 @@
+import json
+from typing import Iterable
+
+from db import Company, CompanyTable
+
+# pyarrow is only imported when a Parquet export or query actually runs
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("Parquet export needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+def company_schema(pa):
+    county = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("mbs", pa.string()),
+        ("ime", pa.string()),
+        ("oib", pa.string()),
+        ("djelatnost_sifra", pa.dictionary(pa.int32(), pa.string())),
+        ("djelatnost_naziv", pa.string()),
+        ("zupanija", county),
+        ("adresa", pa.string()),
+        ("naselje", pa.string()),
+        ("email_adrese", pa.list_(pa.string())),
+        ("telefonski_brojevi", pa.list_(pa.string())),
+        ("ostalo", pa.string()),
+        ("gfi_count", pa.int32()),
+        ("status", pa.int16()),
+        ("naznaka_imena", pa.string()),
+        ("pravni_oblik", pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+def details_schema(pa):
+    return pa.schema([
+        ("mbs", pa.string()),
+        ("oib", pa.string()),
+        ("ime", pa.string()),
+        ("naznaka_imena", pa.string()),
+        ("status", pa.int16()),
+        ("djelatnost_sifra", pa.dictionary(pa.int32(), pa.string())),
+        ("djelatnost_naziv", pa.string()),
+        ("zupanija", pa.dictionary(pa.int32(), pa.string())),
+        ("naselje", pa.string()),
+        ("ulica", pa.string()),
+        ("kucni_broj", pa.string()),
+        ("pravni_oblik", pa.dictionary(pa.int32(), pa.string())),
+        ("email_adrese", pa.list_(pa.string())),
+        ("gfi_count", pa.int32()),
+        ("raw", pa.string()),
+    ])
+
+def to_str(value) -> str | None:
+    return None if value is None or value == "" else str(value)
+
+# email_adrese holds a list when it comes from the list API and a ", " joined string after
+# inject_from_sudreg_object
+def to_list(value) -> list[str] | None:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return [str(v) for v in value]
+
+def company_columns(table: CompanyTable) -> dict[str, list]:
+    c = table.columns
+    return {
+        "mbs": [to_str(v) for v in c["mbs"]],
+        "ime": c["ime"],
+        "oib": [to_str(v) for v in c["oib"]],
+        "djelatnost_sifra": [to_str(v) for v in c["djelatnost_sifra"]],
+        "djelatnost_naziv": [to_str(v) for v in c["djelatnost_naziv"]],
+        "zupanija": [to_str(v) for v in c["zupanija"]],
+        "adresa": c["adresa"],
+        "naselje": [to_str(v) for v in c["naselje"]],
+        "email_adrese": [to_list(v) for v in c["email_adrese"]],
+        "telefonski_brojevi": [to_list(v) for v in c["telefonski_brojevi"]],
+        "ostalo": [json.dumps(v, ensure_ascii=False) if v else None for v in c["ostalo"]],
+        "gfi_count": c["gfi_count"],
+        "status": c["status"],
+        "naznaka_imena": c["naznaka_imena"],
+        "pravni_oblik": [to_str(v) for v in c["pravni_oblik"]],
+    }
+
+def details_row(details: dict) -> dict:
+    sjediste = details.get('sjediste', {})
+    djelatnost = details.get('pretezita_djelatnost', {})
+    tvrtka = details.get('tvrtka', {})
+    return {
+        "mbs": to_str(details.get('mbs')),
+        "oib": to_str(details.get('oib')),
+        "ime": tvrtka.get('ime'),
+        "naznaka_imena": tvrtka.get('naznaka_imena'),
+        "status": details.get('status'),
+        "djelatnost_sifra": to_str(djelatnost.get('sifra')),
+        "djelatnost_naziv": to_str(djelatnost.get('puni_naziv')),
+        "zupanija": to_str(sjediste.get('naziv_zupanije')),
+        "naselje": to_str(sjediste.get('naziv_naselja')),
+        "ulica": to_str(sjediste.get('ulica')),
+        "kucni_broj": to_str(sjediste.get('kucni_broj')),
+        "pravni_oblik": to_str((details.get('pravni_oblik') or {}).get('vrsta_pravnog_oblika', {}).get('kratica')),
+        "email_adrese": [e['adresa'] for e in details.get('email_adrese', []) if e.get('adresa')],
+        "gfi_count": len(details.get('gfi', [])),
+        "raw": json.dumps(details, ensure_ascii=False),
+    }
+
+# one row group per county, so a filter on zupanija skips whole row groups
+def write_partitioned(file_path: str, columns: dict[str, list], schema):
+    pa = import_pyarrow()
+    groups: dict[str, list[int]] = {}
+    for i, county in enumerate(columns["zupanija"]):
+        groups.setdefault(county or "", []).append(i)
+
+    with pa.parquet.ParquetWriter(file_path, schema, compression="zstd") as writer:
+        for county in sorted(groups):
+            rows = groups[county]
+            arrays = [pa.array([columns[field.name][i] for i in rows], type=field.type) for field in schema]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+def export_companies_to_parquet(companies: Iterable[Company], file_path: str) -> int:
+    pa = import_pyarrow()
+    table = CompanyTable.from_companies(companies)
+    write_partitioned(file_path, company_columns(table), company_schema(pa))
+    return len(table)
+
+# details are (mbs, details) pairs as returned by DetailStore.iter_details
+def export_details_to_parquet(details: Iterable[tuple[str, dict]], file_path: str) -> int:
+    pa = import_pyarrow()
+    schema = details_schema(pa)
+    columns: dict[str, list] = {field.name: [] for field in schema}
+
+    for mbs, data in details:
+        row = details_row(data)
+        row["mbs"] = row["mbs"] or mbs
+        for name, value in row.items():
+            columns[name].append(value)
+
+    write_partitioned(file_path, columns, schema)
+    return len(columns["mbs"])
+
+def read_parquet(file_path: str, filter=None, columns: list[str] | None = None):
+    pa = import_pyarrow()
+    return pa.dataset.dataset(file_path, format="parquet").to_table(filter=filter, columns=columns)
+
+# the export_to_csv defaults as a pyarrow expression: not in bankruptcy and with at least one email
+def contactable_filter():
+    pa = import_pyarrow()
+    pc = pa.compute
+    not_stecaj = (pc.field("status") != 4) & ~pc.match_substring(pc.utf8_lower(pc.field("ime")), "stečaj")
+    has_email = pc.list_value_length(pc.field("email_adrese")) > 0
+    return not_stecaj & has_email
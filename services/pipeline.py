@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+
+from termcolor import colored
+
+from api_clients import CompanyWallApiClient
+from config import Config
+from db import Company, Database, SqliteDatabase
+from .sudreg_service import SudregService
+from metrics import registry
+
+class HarvestPipeline:
+    # list -> details -> companywall as one streaming run: every filtered company of a list page is
+    # handed over bounded queues to the detail workers and from them to the CompanyWall workers, so
+    # the stages overlap and a full queue holds back the stage in front of it. Each stage keeps its
+    # own checkpoint (the list offset, the per-item status in job state), so an interrupted run
+    # resumes every stage where it stopped.
+    STAGES = ("list", "details", "companywall")
+    SAVE_EVERY = 50
+    PROGRESS_INTERVAL = 5
+
+    service: SudregService
+    config: Config
+    db: Database | SqliteDatabase
+    stages: list[str]
+    skip_existing: bool
+    lock: threading.Lock
+    stopped: threading.Event
+    queues: dict[str, queue.Queue]
+    skip: dict[str, set[str]]
+    failed: list[Company]
+    errors: list[Exception]
+    unsaved: int = 0
+    started: float = 0.0
+    first_enriched: float | None = None
+
+    def __init__(self, service: SudregService, stages: list[str], skip_existing: bool = True):
+        self.service = service
+        self.config = service.config
+        self.db = service.db
+        self.stages = [s for s in self.STAGES if s in stages]
+        self.skip_existing = skip_existing
+        # the databases are not thread safe, every write and save goes through this lock
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        size = max(1, service.config.pipeline_queue_size)
+        self.queues = {stage: queue.Queue(maxsize=size) for stage in ("details", "companywall")}
+        self.skip = {}
+        self.failed = []
+        self.errors = []
+
+    def get_workers(self, stage: str) -> int:
+        if stage == "details":
+            return max(1, self.config.fetch_workers)
+        return max(1, self.config.companywall_connections)
+
+    # the first stage after `stage` that is part of this run
+    def get_next_stage(self, stage: str) -> str | None:
+        following = self.STAGES[self.STAGES.index(stage) + 1:]
+        return next((s for s in following if s in self.stages), None)
+
+    def put(self, stage: str, company: Company | None):
+        while not self.stopped.is_set():
+            try:
+                self.queues[stage].put(company, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def forward(self, stage: str, company: Company):
+        next_stage = self.get_next_stage(stage)
+        if next_stage and str(company.mbs) not in self.skip[next_stage]:
+            self.put(next_stage, company)
+
+    def run(self, resume: bool = False) -> list[Company]:
+        for stage in self.stages:
+            if stage == "list":
+                continue
+            self.skip[stage] = set()
+            if self.skip_existing:
+                # the same companies get_pending skips: done, out of retries or stored before job state existed
+                job_state = self.service.job_state
+                self.skip[stage] = job_state.done_keys(stage) | job_state.exhausted_keys(stage) | self.service.detail_store.fetched_mbs(SudregService.STAGE_NAMESPACES[stage])
+            registry.start_stage(stage)
+
+        self.started = time.monotonic()
+        self.service.progress.report("pipeline_started", f"Pipeline {colored(' -> '.join(self.stages), 'yellow')}", stages=self.stages)
+
+        parse_pool = None
+        workers = {"details": lambda: self.run_worker("details", self.fetch_details)}
+        if "companywall" in self.stages:
+            parse_pool = self.service.create_parse_pool()
+            companywall_api = CompanyWallApiClient(self.config, self.db, self.service.profile_index)
+            workers["companywall"] = lambda: self.run_worker("companywall", lambda c: self.fetch_companywall(companywall_api, parse_pool, c))
+        producer = threading.Thread(target=self.produce, args=(resume,), daemon=True)
+        threads = {
+            stage: [threading.Thread(target=workers[stage], daemon=True) for _ in range(self.get_workers(stage))]
+            for stage in self.stages if stage != "list"
+        }
+
+        try:
+            producer.start()
+            for stage_threads in threads.values():
+                for thread in stage_threads:
+                    thread.start()
+
+            # a stage ends once the stage in front of it has ended and its queue is drained
+            self.wait([producer])
+            for stage, stage_threads in threads.items():
+                for _ in stage_threads:
+                    self.put(stage, None)
+                self.wait(stage_threads)
+        except KeyboardInterrupt:
+            self.stopped.set()
+            raise
+        finally:
+            self.stopped.set()
+            if parse_pool:
+                parse_pool.shutdown(cancel_futures=True)
+            with self.lock:
+                self.service.save_db()
+
+        if self.errors:
+            raise self.errors[0]
+        self.report_progress("pipeline_finished")
+        return self.failed
+
+    def wait(self, threads: list[threading.Thread]):
+        last_report = time.monotonic()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+                if time.monotonic() - last_report >= self.PROGRESS_INTERVAL:
+                    self.report_progress()
+                    last_report = time.monotonic()
+
+    # feeds the first stage: the listing when it is part of the run, otherwise the companies in the
+    # database; on resume companies listed before the checkpoint that are still pending go first
+    def produce(self, resume: bool):
+        try:
+            if "list" not in self.stages:
+                self.feed(self.db.get_all_companies(), self.stages[0])
+                return
+
+            target = self.get_next_stage("list")
+            offset = self.service.get_resume_offset() if resume else 0
+            if offset and target:
+                self.feed(self.db.get_all_companies(), target)
+
+            registry.start_stage("list")
+            for page_offset, companies in self.service.iter_company_pages(offset):
+                if self.stopped.is_set():
+                    return
+                page = [Company.from_dict(row) for row in self.service.filter_companies(companies)]
+                with self.lock:
+                    counts = self.db.add_companies(page)
+                    offset = page_offset + len(companies)
+                    if self.db.is_dirty:
+                        self.service.set_fetch_job_status(offset)
+                        self.service.save_db()
+                    # the details of a company are only fetched once its list row is saved
+                    self.service.job_state.set_checkpoint("list", {"offset": offset, "finished": False})
+                    stored = [self.db.get_company_my_mbs(c.mbs) for c in page]
+                    total = self.db.count()
+                registry.advance_stage("list", len(companies))
+                self.service.print_fetch_all_job_status(len(companies), total, offset, counts)
+                if target:
+                    self.feed(stored, target)
+
+            with self.lock:
+                self.service.set_fetch_job_status(offset)
+                self.service.save_db()
+                self.service.job_state.set_checkpoint("list", {"offset": offset, "finished": True})
+        except Exception as e:
+            self.fail(e)
+
+    def feed(self, companies: list[Company], stage: str):
+        pending = [c for c in companies if str(c.mbs) not in self.skip[stage]]
+        self.service.job_state.enqueue(stage, (c.mbs for c in pending))
+        for company in pending:
+            self.put(stage, company)
+
+    def run_worker(self, stage: str, process):
+        while True:
+            try:
+                company = self.queues[stage].get(timeout=0.1)
+            except queue.Empty:
+                if self.stopped.is_set():
+                    return
+                continue
+            if company is None or self.stopped.is_set():
+                return
+            try:
+                process(company)
+            except Exception as e:
+                self.fail(e)
+                continue
+            self.forward(stage, company)
+
+    # a failed request or a response inject can't read only fails the company; the database writes
+    # stay outside the try, their errors stop the run. c is the stored company, which the producer may
+    # be saving right now, so the details go into a copy that is merged under the lock
+    def fetch_details(self, c: Company):
+        try:
+            details = self.service.sudreg_api.get_company_details_by_mbs(c.mbs)
+            enriched = Company.from_row(c.to_row())
+            with registry.timer("inject_seconds"):
+                enriched.inject_from_sudreg_object(details)
+        except Exception as e:
+            self.mark_failed("details", c, e)
+            return
+
+        with self.lock:
+            self.db.add_company(enriched)
+            self.service.store_company_details_locally(c.mbs, details)
+            self.service.job_state.mark_done("details", c.mbs)
+            self.unsaved += 1
+            if self.unsaved >= self.SAVE_EVERY:
+                self.service.save_db()
+                self.unsaved = 0
+        registry.advance_stage("details")
+        self.enriched("details")
+        self.service.progress.report("details_fetched", f"{colored(c.oib, 'green')} {c.ime}", mbs=c.mbs, oib=c.oib)
+
+    # extract_company_data raises for a page that is not accessible, has no profile link or can't be
+    # parsed; every one of them fails only the company and sends it to the retry queue
+    def fetch_companywall(self, companywall_api: CompanyWallApiClient, parse_pool, c: Company):
+        try:
+            details = companywall_api.extract_company_data(c.oib, parse_pool)
+        except Exception as e:
+            self.mark_failed("companywall", c, e)
+            return
+
+        self.service.store_companywall_details_locally(c.mbs, details)
+        self.service.job_state.mark_done("companywall", c.mbs)
+        registry.advance_stage("companywall")
+        self.enriched("companywall")
+        self.service.progress.report("companywall_fetched", f"{colored(c.oib, 'green')} {c.ime}", mbs=c.mbs, oib=c.oib)
+
+    def mark_failed(self, stage: str, c: Company, error: Exception):
+        self.service.progress.report(f"{stage}_failed", f"Error fetching {stage} details for {colored(c.mbs, 'yellow')} {colored(c.ime, 'green')}: {error}", mbs=c.mbs, error=str(error))
+        self.service.job_state.mark_failed(stage, c.mbs, str(error))
+        registry.inc("items_failed_total", stage=stage)
+        with self.lock:
+            self.failed.append(c)
+
+    # the time until the first company made it through the last stage of the run
+    def enriched(self, stage: str):
+        if stage == self.stages[-1] and self.first_enriched is None:
+            self.first_enriched = time.monotonic()
+            registry.observe("pipeline_first_item_seconds", self.first_enriched - self.started)
+
+    # an error outside of a single item (a list page, the database) stops the whole run
+    def fail(self, error: Exception):
+        self.service.progress.report("error", f"Error: {error}", error=str(error))
+        self.errors.append(error)
+        self.stopped.set()
+
+    def report_progress(self, event: str = "pipeline_progress"):
+        elapsed = time.monotonic() - self.started
+        done = {stage: registry.get_stage(stage).done if registry.get_stage(stage) else 0 for stage in self.stages}
+        queued = {stage: q.qsize() for stage, q in self.queues.items() if stage in self.stages}
+        msg = ", ".join(f"{stage}: {colored(str(count), 'yellow')}" for stage, count in done.items())
+        msg += f" in {elapsed:.0f}s, queued: {queued}"
+        first_item = round(self.first_enriched - self.started, 2) if self.first_enriched else None
+        self.service.progress.report(event, msg, done=done, queued=queued, seconds=round(elapsed, 1), first_item_seconds=first_item, failed=len(self.failed))
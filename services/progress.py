@@ -0,0 +1,21 @@
+import json
+import sys
+import time
+
+class ConsoleProgress:
+    # the colored lines the interactive menu has always printed
+    def report(self, event: str, message: str, **fields):
+        print(message)
+
+class JsonProgress:
+    # one JSON object per line for schedulers and log collectors, colors are left out
+    stream: any
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def report(self, event: str, message: str, **fields):
+        record = {"time": round(time.time(), 3), "event": event, **fields}
+        # one write per record, so lines reported from several threads never interleave
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
@@ -0,0 +1,168 @@
+import glob
+import multiprocessing
+import os
+import socket
+import time
+
+from termcolor import colored
+
+from config import Config
+from api_clients import SudregApiClient
+from db import Company, Database, ShardCoordinator, open_database
+from .sudreg_service import SudregService
+from .progress import ConsoleProgress, JsonProgress
+import metrics
+
+# Sharded harvesting: every process (on this host or any other that sees the same files) leases
+# offset ranges of the company list from a ShardCoordinator, writes the companies it fetched to its
+# own NDJSON database and the merge step folds all of them into the main database.
+
+def get_shard_output_path(output_dir: str, worker_name: str) -> str:
+    return os.path.join(output_dir, f"shard-{worker_name}.ndjson")
+
+def iter_shard_pages(sudreg_api: SudregApiClient, start: int, stop: int):
+    offset = start
+    while offset < stop:
+        try:
+            companies = sudreg_api.get_company_list(offset)
+        except Exception as e:
+            if SudregApiClient.NO_ROWS_MESSAGE in str(e):
+                return
+            raise e
+        if len(companies) == 0:
+            return
+        yield offset, companies
+        if len(companies) < SudregApiClient.PAGE_SIZE:
+            return
+        offset += len(companies)
+
+# the progress of a shard worker; every report of the detail and CompanyWall stages also renews the
+# lease of the current shard once a third of lease_seconds has passed, so a long detail stage keeps it
+class LeaseProgress:
+    progress: ConsoleProgress | JsonProgress
+    coordinator: ShardCoordinator
+    worker_name: str
+    start: int | None = None
+    renewed_at: float = 0.0
+
+    def __init__(self, progress: ConsoleProgress | JsonProgress, coordinator: ShardCoordinator, worker_name: str):
+        self.progress = progress
+        self.coordinator = coordinator
+        self.worker_name = worker_name
+
+    def hold(self, start: int | None):
+        self.start = start
+        self.renewed_at = time.monotonic()
+
+    def renew(self):
+        if self.start is None:
+            return
+        self.renewed_at = time.monotonic()
+        self.coordinator.renew(self.start, self.worker_name)
+
+    def report(self, event: str, message: str, **fields):
+        self.progress.report(event, message, **fields)
+        if self.start is not None and time.monotonic() - self.renewed_at >= self.coordinator.lease_seconds / 3:
+            self.renew()
+
+# runs shards until the coordinator has none left, returns the number of companies written
+def run_shard_worker(worker_name: str, coordinator_path: str, output_dir: str, stages: list[str], overrides: dict | None = None, json_progress: bool = False) -> int:
+    config = Config()
+    for name, value in (overrides or {}).items():
+        setattr(config, name, value)
+    coordinator = ShardCoordinator(coordinator_path, config.shard_size)
+    progress = LeaseProgress(JsonProgress() if json_progress else ConsoleProgress(), coordinator, worker_name)
+    sudreg_api = SudregApiClient(config)
+    db = Database(get_shard_output_path(output_dir, worker_name))
+    service = SudregService(sudreg_api, db, config, progress)
+    # every worker dumps its own metrics file, a shared port would clash
+    config.metrics_port = 0
+    if config.metrics_dump_path:
+        config.metrics_dump_path = f"{config.metrics_dump_path}.{worker_name}"
+    exporters = metrics.start_exporters(config)
+    written = 0
+
+    try:
+        while True:
+            shard = coordinator.acquire(worker_name)
+            if shard is None:
+                break
+            start, stop = shard
+            progress.hold(start)
+            progress.report("shard_started", f"Shard {colored(f'{start}-{stop}', 'yellow')} on {worker_name}", worker=worker_name, start=start, stop=stop)
+
+            rows = 0
+            end_reached = True
+            companies: list[Company] = []
+            try:
+                for page_offset, page in iter_shard_pages(sudreg_api, start, stop):
+                    page_companies = [Company.from_dict(row) for row in service.filter_companies(page)]
+                    db.add_companies(page_companies)
+                    companies += page_companies
+                    rows = page_offset + len(page) - start
+                    end_reached = len(page) < SudregApiClient.PAGE_SIZE
+                    progress.renew()
+                end_reached = end_reached or rows < stop - start
+
+                if "details" in stages:
+                    service.fetch_company_details(companies)
+                if "companywall" in stages:
+                    service.get_company_details_from_companywall(companies)
+                service.save_db()
+            except Exception:
+                coordinator.release(start, worker_name)
+                raise
+
+            progress.hold(None)
+            if not coordinator.complete(start, worker_name, rows, end_reached):
+                # the lease ran out and another worker took the shard over, its companies are still
+                # in this worker's output but the shard is counted for the other worker
+                progress.report("shard_lost", f"Shard {colored(f'{start}-{stop}', 'yellow')} was handed to another worker before {worker_name} finished it", worker=worker_name, start=start, stop=stop)
+                continue
+            written += len(companies)
+            progress.report("shard_finished", f"Shard {colored(f'{start}-{stop}', 'yellow')} done, companies: {colored(str(len(companies)), 'yellow')}", worker=worker_name, start=start, stop=stop, companies=len(companies), end_reached=end_reached)
+    finally:
+        db.save_to_file()
+        db.compact()
+        db.close()
+        coordinator.close()
+        metrics.close_exporters(exporters)
+
+    return written
+
+# folds every shard output into the target database; add_companies merges with update_with_values,
+# so a company listed by two shards ends up as one record with the non-empty values of both
+def merge_shards(output_dir: str, target_path: str) -> int:
+    target = open_database(target_path)
+    merged = 0
+    for file_path in sorted(glob.glob(os.path.join(output_dir, "shard-*.ndjson"))):
+        shard = Database(file_path)
+        counts = target.add_companies(shard.iter_companies())
+        merged += sum(counts.values())
+        shard.close()
+        target.save_to_file()
+    target.compact()
+    target.close()
+    return merged
+
+# starts `processes` workers on this host; each gets an equal part of max_requests_per_second,
+# so the whole host stays within the configured rate
+def run_shard_workers(processes: int, coordinator_path: str, output_dir: str, stages: list[str], overrides: dict | None = None, json_progress: bool = False) -> bool:
+    overrides = dict(overrides or {})
+    config = Config()
+    rate = overrides.get("max_requests_per_second", config.max_requests_per_second)
+    if rate:
+        overrides["max_requests_per_second"] = rate / processes
+
+    os.makedirs(output_dir, exist_ok=True)
+    host = socket.gethostname()
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_shard_worker, args=(f"{host}-{i}", coordinator_path, output_dir, stages, overrides, json_progress))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return all(worker.exitcode == 0 for worker in workers)
@@ -1,139 +1,319 @@
-import os
-import csv
 import json
+import multiprocessing
 import time
+import queue
+import asyncio
+import threading
+from datetime import datetime, timezone
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
+from typing import Callable
+from urllib.parse import urlsplit
 from config import Config
 from termcolor import colored
-from api_clients import SudregApiClient, CompanyWallApiClient
-from db import Company, Database
+from api_clients import SudregApiClient, AsyncSudregApiClient, CompanyWallApiClient
+from db import Company, Database, SqliteDatabase, SyncState, DetailStore, ProfileIndex, JobState
+from .csv_export import CsvExport
+from .company_filter import CompanyFilter
+from .progress import ConsoleProgress, JsonProgress
+from . import parquet_export
+from metrics import registry
 
 class SudregService:
-    COMPANY_DETAILS_DIR = "data/details"
-    COMPANYWALL_DETAILS_DIR = "data/companywall"
+    STAGE_NAMESPACES = {"details": "sudreg", "companywall": "companywall"}
+    SYNC_STATE_PATH = "data/sync_state.json"
+    CHANGE_LOG_PATH = "data/changes.ndjson"
+    CSV_HEADER = ['MBS', 'Ime', 'OIB', 'DJELATNOST_SIFRA', 'DJELATNOST_NAZIV', 'ZUPANIJA', 'ADRESA', 'NASELJE', 'EMAIL_ADRESE', 'TELEFONSKI_BROJEVI', 'GFI_COUNT', 'STATUS', 'NAZNAKA_IMENA', 'PRAVNI_OBLIK', 'OSTALO']
 
     sudreg_api: SudregApiClient
-    db: Database
+    db: Database | SqliteDatabase
     config: Config
+    company_filter: CompanyFilter
+    detail_store: DetailStore
+    profile_index: ProfileIndex
+    progress: ConsoleProgress | JsonProgress
+    job_state: JobState
     
-    def __init__(self, sudreg_api: SudregApiClient, db: Database, config: Config):
+    def __init__(self, sudreg_api: SudregApiClient, db: Database | SqliteDatabase, config: Config, progress: ConsoleProgress | JsonProgress | None = None):
         self.sudreg_api = sudreg_api
         self.db = db
         self.config = config
+        self.progress = progress or ConsoleProgress()
+        self.company_filter = CompanyFilter.from_config(config)
+        self.detail_store = DetailStore(config.detail_store_path, config.detail_compression)
+        self.profile_index = ProfileIndex(config.profile_index_path or ProfileIndex.get_default_path(config.db_file_path))
+        self.job_state = JobState(config.job_state_path or JobState.get_default_path(config.db_file_path), config.max_item_retries)
+
+    # with resume the listing continues at the offset of the last checkpoint
+    def fetch_all_companies(self, resume: bool = False) -> list[Company]:
+        offset = self.get_resume_offset() if resume else 0
+
+        registry.start_stage("list")
+        for page_offset, companies in self.iter_company_pages(offset):
+            counts = self.db.add_companies(Company.from_dict(row) for row in self.filter_companies(companies))
+            registry.advance_stage("list", len(companies))
+            for change, count in counts.items():
+                registry.inc("list_companies_total", count, change=change)
+
+            offset = page_offset + len(companies)
+            # a page that changed nothing needs no save, the checkpoint alone records the progress
+            if self.db.is_dirty:
+                self.set_fetch_job_status(offset)
+                self.save_db()
+            # the checkpoint only moves once the page is safely in the database
+            self.job_state.set_checkpoint("list", {"offset": offset, "finished": False})
+            self.print_fetch_all_job_status(len(companies), self.db.count(), offset, counts)
+
+        self.set_fetch_job_status(offset)
+        self.save_db()
+        self.job_state.set_checkpoint("list", {"offset": offset, "finished": True})
+        return self.db.get_all_companies()
 
-    def fetch_all_companies(self) -> list[Company]:
-        offset = 0
+    # the list checkpoint, or fetch_job_status for databases filled before job state existed
+    def get_resume_offset(self) -> int:
+        checkpoint = self.job_state.get_checkpoint("list")
+        if checkpoint:
+            return checkpoint.get('offset', 0)
         status = self.db.get_fetch_job_status()
+        return status.get('offset', 0) if status else 0
+
+    # the companies a stage still has to do: everything when skip_existing is off, otherwise those
+    # not done yet and not out of retries; retry_failed picks only the failed ones, retries or not
+    def get_pending(self, stage: str, companies: list[Company], skip_existing: bool = True, retry_failed: bool = False) -> list[Company]:
+        self.job_state.enqueue(stage, (c.mbs for c in companies))
+        if retry_failed:
+            failed = self.job_state.retry_keys(stage) | self.job_state.exhausted_keys(stage)
+            return [c for c in companies if str(c.mbs) in failed]
+        if not skip_existing:
+            return list(companies)
+
+        # details stored before job state existed count as done as well
+        skip = self.job_state.done_keys(stage) | self.job_state.exhausted_keys(stage) | self.detail_store.fetched_mbs(self.STAGE_NAMESPACES[stage])
+        return [c for c in companies if str(c.mbs) not in skip]
+
+    def filter_companies(self, companies: list[dict]) -> list[dict]:
+        return self.company_filter.filter_rows(companies)
+
+    # pages through the listing like fetch_all_companies, but only companies whose list row is new
+    # or changed since the last sync get their details fetched again; companies gone from the
+    # listing are removed from the database together with their fingerprint
+    def sync_companies(self) -> dict[str, list]:
+        state = SyncState(self.SYNC_STATE_PATH)
+        seen: dict[str, str] = {}
+        changes: dict[str, list] = {"added": [], "changed": [], "deleted": []}
+
+        for page_offset, companies in self.iter_company_pages():
+            page: list[Company] = []
+            for row in self.filter_companies(companies):
+                key = str(row['mbs'])
+                seen[key] = SyncState.fingerprint(row)
+                previous = state.fingerprints.get(key)
+                if previous == seen[key]:
+                    continue
+
+                changes["added" if previous is None else "changed"].append(key)
+                page.append(Company.from_dict(row))
+
+            self.db.add_companies(page)
+            if self.db.is_dirty:
+                self.save_db()
+            self.print_fetch_all_job_status(len(companies), self.db.count(), page_offset + len(companies))
+
+        changes["deleted"] = [key for key in state.fingerprints if key not in seen]
+
+        by_key = {str(c.mbs): c for c in self.db.get_all_companies()}
+        added = [by_key[key] for key in changes["added"]]
+        refreshed = [by_key[key] for key in changes["changed"]]
+        failed = self.fetch_company_details(added)
+        failed += self.fetch_company_details(refreshed, skip_existing=False)
+
+        self.db.remove_companies([by_key[key].mbs for key in changes["deleted"] if key in by_key])
+        if self.db.is_dirty:
+            self.save_db()
+
+        # failed companies keep their old fingerprint, so the next sync picks them up again
+        failed_keys = {str(c.mbs) for c in failed}
+        for key, fingerprint in seen.items():
+            if key not in failed_keys:
+                state.fingerprints[key] = fingerprint
+        for key in changes["deleted"]:
+            del state.fingerprints[key]
+        state.save_to_file()
+
+        self.write_change_log(changes, by_key)
+        self.print_sync_status(changes)
+        return changes
+
+    def write_change_log(self, changes: dict[str, list], by_key: dict[str, Company]):
+        synced_at = datetime.now(timezone.utc).isoformat()
+        with open(self.CHANGE_LOG_PATH, 'a') as f:
+            for change, keys in changes.items():
+                for key in keys:
+                    c = by_key.get(key)
+                    f.write(json.dumps({"synced_at": synced_at, "change": change, "mbs": key, "ime": c.ime if c else None}, ensure_ascii=False))
+                    f.write("\n")
+
+    def iter_company_pages(self, offset: int = 0):
+        if self.config.page_prefetch > 1:
+            yield from self.iter_company_pages_pipelined(offset)
+            return
 
-        if status and status.get('offset', 0) > 0:
-            choice = input(f"Do you want to continue from offset {status.get('offset', 0)}? [Y/n] ") or "y"
-            if choice.lower() == "y":
-                offset = status.get('offset', 0)
-    
         while True:
             try:
                 companies = self.sudreg_api.get_company_list(offset)
             except Exception as e:
-                if "Vaš zahtjev nije vratio ni jedan redak" in str(e):
+                if SudregApiClient.NO_ROWS_MESSAGE in str(e):
                     break
                 raise e
 
             if len(companies) == 0:
                 break
 
-            filtered_companies = [c for c in companies if self.config.company_filter and c['ime'].lower().find(self.config.company_filter.lower()) > -1]
-            filtered_companies = [c for c in filtered_companies if not c['ime'].lower().find(self.config.company_filter_out.lower()) > -1]
-            for company in filtered_companies:
-                self.db.add_company(Company(**company))
-
+            yield offset, companies
+            if len(companies) < SudregApiClient.PAGE_SIZE:
+                break
             offset += len(companies)
-            self.set_fetch_job_status(offset)
-            self.save_db()
-            self.print_fetch_all_job_status(len(companies), self.db.count(), offset)
-
-        return self.db.get_all_companies()
-
-    def fetch_all_companies_from_sudreg(self):
-        offset = 0
-        all: dict[str, str] = {}
 
-        while True:
+    def iter_company_pages_pipelined(self, offset: int = 0):
+        # the async client runs on its own event loop thread, so saving a page here
+        # does not hold back the requests that are already in flight
+        pages: queue.Queue = queue.Queue(maxsize=self.config.page_prefetch)
+        stopped = threading.Event()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        async def produce():
+            async with AsyncSudregApiClient(self.config, self.sudreg_api.rate_limiter) as api:
+                await api.authenticate()
+                async for page in api.iter_company_pages(offset, self.config.page_prefetch):
+                    await asyncio.to_thread(put, page)
+                    if stopped.is_set():
+                        break
+
+        def run():
             try:
-                companies = self.sudreg_api.get_company_list(offset)
+                asyncio.run(produce())
+                put(None)
             except Exception as e:
-                print(f"Error fetching companies: {e}")
-                break
-
-            all.update({c['mbs']: c['ime'] for c in companies})
-
-            print(f"Exported: {colored(len(all), 'yellow')} companies")
-            offset += len(companies)
-            if len(companies) < 1000:
-                break
-
-        return all
-
-    def export_all_companies_to_csv(self, file_path: str):
-        all_companies = self.fetch_all_companies_from_sudreg()
-
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-        with open(file_path, 'w') as f:
-            writer = csv.writer(f)
-            writer.writerow(['MBS', 'Ime'])
-            for mbs, ime in all_companies.items():
-                writer.writerow([mbs, ime])
-
-    def fetch_company_details(self, companies: list[Company]):
+                put(e)
+
+        producer = threading.Thread(target=run, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            producer.join()
+
+    # streams the listing page by page into the file; on resume the listing continues at the
+    # offset of the last checkpoint, which is always taken at a page boundary
+    def export_all_companies_to_csv(self, file_path: str, resume: bool = False):
+        # the error is caught outside of the export, so it keeps its checkpoint and can be resumed
+        try:
+            with CsvExport(file_path, ['MBS', 'Ime'], resume) as export:
+                for _, companies in self.iter_company_pages(export.rows):
+                    export.writerows([c['mbs'], c['ime']] for c in companies)
+                    export.checkpoint()
+                    self.progress.report("csv_exported", f"Exported: {colored(export.rows, 'yellow')} companies", rows=export.rows)
+        except Exception as e:
+            self.progress.report("error", f"Error fetching companies: {e}", error=str(e))
+
+    # returns the companies whose details could not be fetched
+    def fetch_company_details(self, companies: list[Company], skip_existing: bool = True, retry_failed: bool = False) -> list[Company]:
         processed_count = 0
+        failed: list[Company] = []
+
+        self.progress.report("details_started", f"Fetching company details for {colored(str(len(companies)), 'yellow')} companies", count=len(companies))
+
+        pending = self.get_pending("details", companies, skip_existing, retry_failed)
+        registry.start_stage("details", len(pending))
+        if self.config.fetch_workers > 1:
+            results = self.run_windowed(self.fetch_single_company_details, pending, self.config.fetch_workers)
+        else:
+            results = (self.fetch_single_company_details(c) for c in pending)
+
+        # results arrive in the same order as companies, whatever the worker count
+        for c, details, error in results:
+            if error:
+                self.progress.report("details_failed", f"Error fetching company details for {colored(c.mbs, 'yellow')} {colored(c.ime, 'green')}: {error}", mbs=c.mbs, error=str(error))
+                self.job_state.mark_failed("details", c.mbs, str(error))
+                registry.inc("items_failed_total", stage="details")
+                failed.append(c)
+                continue
 
-        print(f"Fetching company details for {colored(str(len(companies)), 'yellow')} companies")
-        print()
+            self.db.add_company(c)
+            processed_count += 1
 
-        choice = input("Continue? [y/N] ") or "n"
-        if choice.lower() != "y":
-            return
+            self.store_company_details_locally(c.mbs, details)
+            self.job_state.mark_done("details", c.mbs)
+            registry.advance_stage("details")
+            self.progress.report("details_fetched", f"{colored(c.oib, 'green')} {c.ime}", mbs=c.mbs, oib=c.oib)
+            if processed_count % 5 == 0:
+                self.save_db()
+                self.print_fetch_company_details_job_status(processed_count, len(pending) - processed_count)
 
-        for c in companies:
-            details_filename = f"data/details/{c.mbs}.json"
-            if os.path.exists(details_filename):
-                continue
+        if self.db.is_dirty:
+            self.save_db()
 
-            try:
-                details = self.sudreg_api.get_company_details_by_mbs(c.mbs)
-                c.inject_from_sudreg_object(details)
-                processed_count += 1
+        return failed
 
-                self.store_company_details_locally(c.mbs, details)
-                print(colored(c.oib, 'green'), c.ime)
-                if processed_count % 5 == 0:
-                    self.save_db()
-                    self.print_fetch_company_details_job_status(processed_count, len(companies) - processed_count)
-
-            except Exception as e:
-                print(f"Error fetching company details for {colored(c.mbs, 'yellow')} {colored(c.ime, 'green')}: {e}")
-                continue
+    # a response inject_from_sudreg_object can't read fails the company the same way a failed request does;
+    # the details go into a copy, the stored company only changes once the copy is merged with add_company
+    def fetch_single_company_details(self, c: Company) -> tuple[Company, dict | None, Exception | None]:
+        try:
+            details = self.sudreg_api.get_company_details_by_mbs(c.mbs)
+            enriched = Company.from_row(c.to_row())
+            with registry.timer("inject_seconds"):
+                enriched.inject_from_sudreg_object(details)
+            return enriched, details, None
+        except Exception as e:
+            return c, None, e
 
     def store_company_details_locally(self, mbs: str, details: dict):
-        filename = self.get_company_details_filename(mbs)
-        with open(filename, 'w') as f:
-            json.dump(details, f, indent=2)
+        self.detail_store.put("sudreg", mbs, details)
 
     def store_companywall_details_locally(self, mbs: str, details: dict):
-        filename = self.get_companywall_details_filename(mbs)
-        with open(filename, 'w') as f:
-            json.dump(details, f, indent=2)
+        self.detail_store.put("companywall", mbs, details)
 
-    def print_fetch_all_job_status(self, batch_count: int, total_count: int, offset: int):
+    def print_fetch_all_job_status(self, batch_count: int, total_count: int, offset: int, counts: dict[str, int] | None = None):
         msg = f"Fetched {colored(str(batch_count), 'yellow')} companies. Total companies: {colored(str(total_count), 'yellow')}, current offset: {colored(str(offset), 'yellow')}."
-        print(msg)
+        if counts:
+            msg += f" New: {colored(str(counts['added']), 'yellow')}, updated: {colored(str(counts['updated']), 'yellow')}, unchanged: {colored(str(counts['unchanged']), 'yellow')}."
+        self.progress.report("list_page", msg, batch=batch_count, total=total_count, offset=offset, **(counts or {}))
 
     def print_fetch_company_details_job_status(self, fetched_count: int, remaining_count: int):
-        msg = f"Fetched {colored(str(fetched_count), 'yellow')} companies. Remaining: {colored(str(remaining_count), 'yellow')}."
-        print(msg)
-
+        stage = registry.get_stage("details")
+        rate, eta = (stage.rate(), stage.eta()) if stage else (0.0, None)
+        eta_text = time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else "?"
+        msg = f"Fetched {colored(str(fetched_count), 'yellow')} companies. Remaining: {colored(str(remaining_count), 'yellow')}. {rate:.1f}/s, ETA {colored(eta_text, 'yellow')}."
+        self.progress.report("details_progress", msg, fetched=fetched_count, remaining=remaining_count, items_per_second=round(rate, 2), eta_seconds=round(eta) if eta is not None else None)
+
+    def print_sync_status(self, changes: dict[str, list]):
+        msg = f"Added: {colored(str(len(changes['added'])), 'yellow')}, changed: {colored(str(len(changes['changed'])), 'yellow')}, deleted: {colored(str(len(changes['deleted'])), 'yellow')}."
+        self.progress.report("sync_finished", msg, **{change: len(keys) for change, keys in changes.items()})
+
+    # details and item states are committed after the database, so an item is never marked done
+    # before the company it belongs to is saved
     def save_db(self):
-        self.db.save_to_file()
+        with registry.timer("save_seconds", store="database"):
+            self.db.save_to_file()
+        with registry.timer("save_seconds", store="details"):
+            self.detail_store.commit()
+        with registry.timer("save_seconds", store="job_state"):
+            self.job_state.commit()
 
     def set_fetch_job_status(self, offset: int | None = None):
         status = self.db.get_fetch_job_status()
@@ -141,45 +321,122 @@ class SudregService:
             status['offset'] = offset
         self.db.set_fetch_job_status(status)
 
-    def export_to_csv(self, file_path: str, exclude_stecaj: bool = True, exclude_no_email: bool = True):
-        companies = self.db.get_all_companies()
+    def export_to_csv(self, file_path: str, exclude_stecaj: bool = True, exclude_no_email: bool = True, resume: bool = False, filter_spec: str | None = None):
+        terms = (filter_spec or "").split(",")
         if exclude_stecaj:
-            companies = [c for c in companies if c.status != 4 and c.ime.lower().find('stečaj') == -1]
+            terms += ["status!=4", "-stečaj"]
         if exclude_no_email:
-            companies = [c for c in companies if c.email_adrese and len(c.email_adrese) > 0]
+            terms.append("has:email")
+        companies = CompanyFilter.parse(terms).filter_companies(self.db.iter_companies())
 
-        with open(file_path, 'w') as f:
-            writer = csv.writer(f)
-            writer.writerow(['MBS', 'Ime', 'OIB', 'DJELATNOST_SIFRA', 'DJELATNOST_NAZIV', 'ZUPANIJA', 'ADRESA', 'NASELJE', 'EMAIL_ADRESE', 'TELEFONSKI_BROJEVI', 'GFI_COUNT', 'STATUS', 'NAZNAKA_IMENA', 'PRAVNI_OBLIK', 'OSTALO'])
-            for company in companies:
-                writer.writerow([company.mbs, company.ime, company.oib, company.djelatnost_sifra, company.djelatnost_naziv, company.zupanija, company.adresa, company.naselje, company.email_adrese, company.telefonski_brojevi, company.gfi_count, company.status, company.naznaka_imena, company.pravni_oblik, company.ostalo])
+        with CsvExport(file_path, self.CSV_HEADER, resume) as export:
+            # the database iterates in a stable order, so rows before the checkpoint are just skipped
+            for company in islice(companies, export.rows, None):
+                export.writerow([company.mbs, company.ime, company.oib, company.djelatnost_sifra, company.djelatnost_naziv, company.zupanija, company.adresa, company.naselje, company.email_adrese, company.telefonski_brojevi, company.gfi_count, company.status, company.naznaka_imena, company.pravni_oblik, company.ostalo])
 
-    def get_company_details_from_companywall(self):
-        companies = self.db.get_all_companies()
-        processed_count = 0
-        companywall_api = CompanyWallApiClient(self.config, self.db)
+    def export_to_parquet(self, file_path: str):
+        count = parquet_export.export_companies_to_parquet(self.db.iter_companies(), file_path)
+        self.progress.report("parquet_exported", f"Exported {colored(str(count), 'yellow')} companies to {file_path}", count=count, file_path=file_path)
 
-        print(f"Fetching company details for {colored(str(len(companies)), 'yellow')} companies")
-        print()
-        choice = input("Do you want to continue? [y/N] ") or "n"
-        if choice.lower() != "y":
-            return
+    def export_details_to_parquet(self, file_path: str):
+        count = parquet_export.export_details_to_parquet(self.detail_store.iter_details("sudreg"), file_path)
+        self.progress.report("parquet_exported", f"Exported {colored(str(count), 'yellow')} company details to {file_path}", count=count, file_path=file_path)
 
-        for company in companies:
-            filename = self.get_companywall_details_filename(company.mbs)
-            if os.path.exists(filename):
-                continue
+    # returns the companies whose CompanyWall pages could not be fetched
+    def get_company_details_from_companywall(self, companies: list[Company] | None = None, skip_existing: bool = True, retry_failed: bool = False) -> list[Company]:
+        companies = companies if companies is not None else self.db.get_all_companies()
+        processed_count = 0
+        failed: list[Company] = []
+        companywall_api = CompanyWallApiClient(self.config, self.db, self.profile_index)
+
+        self.progress.report("companywall_started", f"Fetching company details for {colored(str(len(companies)), 'yellow')} companies", count=len(companies))
+
+        pending = self.get_pending("companywall", companies, skip_existing, retry_failed)
+        registry.start_stage("companywall", len(pending))
+
+        # pages are fetched by a few polite threads and parsed in worker processes
+        parse_pool = self.create_parse_pool()
+        try:
+            scrape = lambda c: companywall_api.extract_company_data(c.oib, parse_pool)
+            for company, details, error in self.scrape_concurrently(scrape, pending):
+                if error:
+                    self.progress.report("companywall_failed", f"Error fetching CompanyWall details for {colored(company.oib, 'yellow')} {colored(company.ime, 'green')}: {error}", mbs=company.mbs, error=str(error))
+                    self.job_state.mark_failed("companywall", company.mbs, str(error))
+                    registry.inc("items_failed_total", stage="companywall")
+                    failed.append(company)
+                    continue
+                processed_count += 1
+                self.store_companywall_details_locally(company.mbs, details)
+                self.job_state.mark_done("companywall", company.mbs)
+                registry.advance_stage("companywall")
+                self.progress.report("companywall_fetched", f"{colored(company.oib, 'green')} {company.ime}", mbs=company.mbs, oib=company.oib)
+        finally:
+            if parse_pool:
+                parse_pool.shutdown(cancel_futures=True)
+            self.detail_store.commit()
+            self.job_state.commit()
+
+        return failed
+
+    # crawls the profiles listed in a sitemap into the profile index, details of known companies are kept too
+    def seed_profile_index(self, sitemap_url: str) -> int:
+        companywall_api = CompanyWallApiClient(self.config, self.db, self.profile_index)
+        known = self.profile_index.hrefs()
+        hrefs = [urlsplit(u).path for u in companywall_api.iter_sitemap_profiles(sitemap_url)]
+        pending = [h for h in hrefs if h not in known]
+        self.progress.report("sitemap_loaded", f"Sitemap lists {colored(str(len(hrefs)), 'yellow')} profiles, {colored(str(len(pending)), 'yellow')} not indexed yet", count=len(hrefs), pending=len(pending))
+
+        seeded = 0
+        parse_pool = self.create_parse_pool()
+        try:
+            scrape = lambda href: companywall_api.discover_profile(href, parse_pool)
+            for href, result, error in self.scrape_concurrently(scrape, pending):
+                oib, details = result if result else (None, None)
+                if error or not oib:
+                    self.progress.report("profile_failed", f"Error indexing CompanyWall profile {colored(href, 'yellow')}: {error or 'no OIB on the page'}", href=href, error=str(error or 'no OIB on the page'))
+                    continue
+                seeded += 1
+                # the page shows the OIB as text, the databases keep it as the number the API returned
+                company = self.db.get_company_by_oib(int(oib))
+                if company:
+                    self.store_companywall_details_locally(company.mbs, details)
+        finally:
+            if parse_pool:
+                parse_pool.shutdown(cancel_futures=True)
+            self.detail_store.commit()
+
+        self.progress.report("profiles_indexed", f"Indexed {colored(str(seeded), 'yellow')} profiles, total {colored(str(self.profile_index.count()), 'yellow')}", seeded=seeded, total=self.profile_index.count())
+        return seeded
+
+    def create_parse_pool(self) -> ProcessPoolExecutor | None:
+        if self.config.companywall_parse_processes > 0:
+            # spawned, a forked worker would inherit the locks and sockets of the fetch threads
+            return ProcessPoolExecutor(self.config.companywall_parse_processes, mp_context=multiprocessing.get_context("spawn"))
+        return None
+
+    # yields (item, result, error) in the order of items, with companywall_connections scrapes in flight;
+    # the result of a failed scrape is None
+    def scrape_concurrently(self, scrape: Callable[[any], any], items: list):
+        def run(item):
+            try:
+                return item, scrape(item), None
+            except Exception as e:
+                return item, None, e
 
-            details = companywall_api.extract_company_data(company.oib)
-            processed_count += 1
-            self.store_companywall_details_locally(company.mbs, details)
-            print(colored(company.oib, 'green'), company.ime)
+        return self.run_windowed(run, items, max(1, self.config.companywall_connections))
 
-            # wait for 1 second
-            time.sleep(1)
+    # yields run(item) in the order of items; a bounded window of runs is kept ahead of the consumer,
+    # so a slow consumer holds the workers back instead of piling up results
+    def run_windowed(self, run: Callable[[any], any], items: list, workers: int):
+        remaining = iter(items)
+        in_flight: deque = deque()
 
-    def get_company_details_filename(self, mbs: str):
-        return f"{self.COMPANY_DETAILS_DIR}/{mbs}.json"
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for item in islice(remaining, workers * 2):
+                in_flight.append(executor.submit(run, item))
 
-    def get_companywall_details_filename(self, mbs: str):
-        return f"{self.COMPANYWALL_DETAILS_DIR}/{mbs}.json"
\ No newline at end of file
+            while in_flight:
+                future = in_flight.popleft()
+                for item in islice(remaining, 1):
+                    in_flight.append(executor.submit(run, item))
+                yield future.result()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import argparse
+import logging
+
+from termcolor import colored
+
+from config import Config
+from api_clients import SudregApiClient
+from db import ShardCoordinator, open_database
+from services import SudregService, HarvestPipeline, ConsoleProgress, JsonProgress, sharding
+import metrics
+
+# python -m sudreg harvest --stage list,details,companywall --workers 16 --resume [--retry-failed] [--pipeline] [--json]
+# python -m sudreg shard --processes 8 [--stage list,details] [--no-merge | --merge-only] [--reset]
+# runs the same jobs as the menu without any prompts, for cron and other schedulers
+
+STAGES = ("list", "details", "companywall")
+
+EXIT_OK = 0
+EXIT_ITEMS_FAILED = 1
+EXIT_USAGE = 2
+EXIT_ERROR = 3
+EXIT_INTERRUPTED = 130
+
+def parse_stages(value: str) -> list[str]:
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(f"unknown stage {', '.join(unknown)}, choose from {', '.join(STAGES)}")
+    return stages
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m sudreg")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    harvest = commands.add_parser("harvest", help="fetch the company list, Sudreg details and CompanyWall details")
+    harvest.add_argument("--stage", type=parse_stages, default=["list", "details"], help=f"comma separated stages to run in order: {','.join(STAGES)} (default list,details)")
+    harvest.add_argument("--workers", type=int, help="concurrent Sudreg detail requests (fetch_workers)")
+    harvest.add_argument("--resume", action="store_true", help="continue the company list from the offset saved in fetch_job_status")
+    harvest.add_argument("--refresh", action="store_true", help="fetch details again even for companies that already have them")
+    harvest.add_argument("--retry-failed", action="store_true", help="only fetch the details that failed before, including those out of retries")
+    harvest.add_argument("--pipeline", action="store_true", help="run the stages at the same time, every listed company flows on to the next stage")
+    harvest.add_argument("--db", help="database file (db_file_path)")
+    harvest.add_argument("--json", action="store_true", help="print progress as JSON lines")
+
+    shard = commands.add_parser("shard", help="harvest with several processes, each on its own range of list offsets")
+    shard.add_argument("--processes", type=int, default=4, help="worker processes on this host (default 4)")
+    shard.add_argument("--stage", type=parse_stages, default=["list"], help="stages each shard runs for its companies (default list)")
+    shard.add_argument("--coordinator", default="data/shards.sqlite", help="shared SQLite file with the shard leases")
+    shard.add_argument("--output", default="data/shards", help="directory for the per-process outputs")
+    shard.add_argument("--no-merge", action="store_true", help="leave merging to another host, for multi-host runs")
+    shard.add_argument("--merge-only", action="store_true", help="only merge the outputs into the database")
+    shard.add_argument("--reset", action="store_true", help="forget earlier shards and start the listing over")
+    shard.add_argument("--db", help="database file the outputs are merged into (db_file_path)")
+    shard.add_argument("--json", action="store_true", help="print progress as JSON lines")
+    return parser
+
+def apply_arguments(config: Config, args: argparse.Namespace):
+    if getattr(args, "workers", None):
+        config.fetch_workers = args.workers
+    if args.db:
+        config.db_file_path = args.db
+
+# a failing setup (a locked or corrupt database, a busy metrics port) exits with EXIT_ERROR like any
+# other error, EXIT_ITEMS_FAILED only ever means that some items failed
+def harvest(args: argparse.Namespace) -> int:
+    progress = JsonProgress() if args.json else ConsoleProgress()
+    db = None
+    service = None
+    exporters = []
+    failed_count = 0
+
+    try:
+        config = Config()
+        apply_arguments(config, args)
+        sudreg_api = SudregApiClient(config)
+        db = open_database(config.db_file_path)
+        service = SudregService(sudreg_api, db, config, progress)
+        exporters = metrics.start_exporters(config)
+        sudreg_api.authenticate()
+        if args.pipeline:
+            return run_pipeline(service, args, progress)
+        for stage in args.stage:
+            progress.report("stage_started", f"Stage {colored(stage, 'yellow')}", stage=stage)
+            if stage == "list":
+                service.fetch_all_companies(args.resume)
+                failed = []
+            elif stage == "details":
+                failed = service.fetch_company_details(db.get_all_companies(), not args.refresh, args.retry_failed)
+            else:
+                failed = service.get_company_details_from_companywall(None, not args.refresh, args.retry_failed)
+            failed_count += len(failed)
+            counts = service.job_state.counts(stage)
+            progress.report("stage_finished", f"Stage {colored(stage, 'yellow')} finished, failed: {colored(str(len(failed)), 'yellow')}", stage=stage, failed=len(failed), items=counts)
+    except KeyboardInterrupt:
+        progress.report("interrupted", "Interrupted, progress so far is saved")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        logging.error("Greška %s", e)
+        progress.report("error", f"Error: {e}", error=str(e))
+        return EXIT_ERROR
+    finally:
+        close_database(service, db, progress)
+        metrics.close_exporters(exporters)
+
+    return EXIT_ITEMS_FAILED if failed_count else EXIT_OK
+
+# the stages save as they go, this last save only matters after an interrupt; a database that failed
+# to load fails again here, that error is already reported and must not replace the exit status
+def close_database(service: SudregService | None, db, progress: ConsoleProgress | JsonProgress):
+    try:
+        if service is not None:
+            service.save_db()
+        if db is not None:
+            db.close()
+    except Exception as e:
+        logging.error("Greška %s", e)
+        progress.report("error", f"Error closing the database: {e}", error=str(e))
+
+def run_pipeline(service: SudregService, args: argparse.Namespace, progress: ConsoleProgress | JsonProgress) -> int:
+    if args.retry_failed:
+        progress.report("error", "--retry-failed does not work with --pipeline, run the stages one after another", error="usage")
+        return EXIT_USAGE
+
+    failed = HarvestPipeline(service, args.stage, not args.refresh).run(args.resume)
+    for stage in args.stage:
+        progress.report("stage_finished", f"Stage {colored(stage, 'yellow')} finished", stage=stage, items=service.job_state.counts(stage))
+    return EXIT_ITEMS_FAILED if failed else EXIT_OK
+
+def shard(args: argparse.Namespace) -> int:
+    progress = JsonProgress() if args.json else ConsoleProgress()
+
+    try:
+        config = Config()
+        apply_arguments(config, args)
+        if args.reset:
+            coordinator = ShardCoordinator(args.coordinator, config.shard_size)
+            coordinator.reset()
+            coordinator.close()
+
+        if not args.merge_only:
+            overrides = {"db_file_path": config.db_file_path}
+            if not sharding.run_shard_workers(args.processes, args.coordinator, args.output, args.stage, overrides, args.json):
+                progress.report("error", "A shard worker failed, run the command again to finish its shards", error="worker failed")
+                return EXIT_ERROR
+
+        coordinator = ShardCoordinator(args.coordinator, config.shard_size)
+        finished = coordinator.is_finished()
+        progress.report("shards", f"Shards: {coordinator.counts()}", shards=coordinator.counts(), finished=finished)
+        coordinator.close()
+
+        if args.no_merge:
+            return EXIT_OK
+        if not finished:
+            progress.report("error", "The listing is not finished yet, not merging", error="not finished")
+            return EXIT_ITEMS_FAILED
+
+        merged = sharding.merge_shards(args.output, config.db_file_path)
+        progress.report("merged", f"Merged {colored(str(merged), 'yellow')} companies into {config.db_file_path}", merged=merged, db=config.db_file_path)
+    except KeyboardInterrupt:
+        progress.report("interrupted", "Interrupted, finished shards are kept")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        logging.error("Greška %s", e)
+        progress.report("error", f"Error: {e}", error=str(e))
+        return EXIT_ERROR
+
+    return EXIT_OK
+
+def main(argv: list[str] | None = None) -> int:
+    parser = create_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    if args.command == "harvest":
+        return harvest(args)
+    if args.command == "shard":
+        return shard(args)
+    return EXIT_USAGE
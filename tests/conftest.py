@@ -0,0 +1,72 @@
+import pytest
+
+from benchmarks.stub_server import StubServer
+from config import Config
+from api_clients import SudregApiClient
+from db import open_database
+from services import SudregService
+
+class RecordingProgress:
+    events: list[tuple[str, dict]]
+
+    def __init__(self):
+        self.events = []
+
+    def report(self, event: str, message: str, **fields):
+        self.events.append((event, fields))
+
+    def get(self, event: str) -> list[dict]:
+        return [fields for name, fields in self.events if name == event]
+
+@pytest.fixture
+def stub():
+    with StubServer(2500, seed=1) as server:
+        yield server
+
+@pytest.fixture
+def config(stub: StubServer, tmp_path, monkeypatch) -> Config:
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        "api_env": "test",
+        "test_client_id": "test",
+        "test_client_secret": "test",
+        "test_api_url": stub.url,
+        "companywall_url": stub.url,
+        "db_file_path": str(tmp_path / "companies.ndjson"),
+        "detail_store_path": str(tmp_path / "details.sqlite"),
+        "detail_compression": "none",
+        "company_filter": "",
+        "company_filter_out": "",
+        "fetch_workers": "1",
+        "max_requests_per_second": "0",
+        "companywall_requests_per_second": "0",
+        "companywall_parse_processes": "0",
+        "max_retries": "0",
+    }.items():
+        monkeypatch.setenv(name, value)
+    return Config()
+
+# a service over a fresh database, every call builds a new one on the same files, like a restarted run
+@pytest.fixture
+def make_service(config: Config):
+    services = []
+
+    def make() -> SudregService:
+        service = SudregService(SudregApiClient(config), open_database(config.db_file_path), config, RecordingProgress())
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.db.close()
+
+# the listing fails once at `offset`, the way a dropped connection interrupts a run
+def interrupt_listing(service: SudregService, offset: int, monkeypatch):
+    get_company_list = service.sudreg_api.get_company_list
+
+    def interrupted(page_offset: int | None = None) -> list:
+        if page_offset == offset:
+            raise Exception(f"Greška interrupted at offset {offset}")
+        return get_company_list(page_offset)
+
+    monkeypatch.setattr(service.sudreg_api, "get_company_list", interrupted)
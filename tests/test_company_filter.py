@@ -0,0 +1,23 @@
+import pytest
+
+from db import Company
+from services import CompanyFilter
+
+def make_companies() -> list[Company]:
+    return [
+        Company.from_dict({"mbs": 1, "ime": "ALFA d.o.o.", "status": 1, "email_adrese": "info@alfa.hr"}),
+        Company.from_dict({"mbs": 2, "ime": "BETA d.o.o.", "status": 1, "email_adrese": ""}),
+        Company.from_dict({"mbs": 3, "ime": "ALFA u stečaju", "status": 4, "email_adrese": "info@alfa2.hr"}),
+    ]
+
+def test_has_accepts_aliases_and_company_fields():
+    assert [c.mbs for c in CompanyFilter.parse("has:email").filter_companies(make_companies())] == [1, 3]
+    assert [c.mbs for c in CompanyFilter.parse("-has:email_adrese").filter_companies(make_companies())] == [2]
+
+def test_has_rejects_an_unknown_field_when_parsed():
+    with pytest.raises(ValueError, match="has:mail"):
+        CompanyFilter.parse("alfa,has:mail")
+
+def test_terms_and_predicates_combine():
+    companies = CompanyFilter.parse("alfa,status!=4,-stečaj").filter_companies(make_companies())
+    assert [c.mbs for c in companies] == [1]
@@ -0,0 +1,16 @@
+def test_companywall_failures_are_retried_instead_of_stored(stub, make_service):
+    service = make_service()
+    companies = service.fetch_all_companies()[:20]
+
+    stub.error_rate = 1.0
+    failed = service.get_company_details_from_companywall(companies)
+    assert len(failed) == len(companies)
+    assert len(service.progress.get("companywall_failed")) == len(companies)
+    assert service.detail_store.count("companywall") == 0
+    assert service.job_state.retry_keys("companywall") == {str(c.mbs) for c in companies}
+
+    stub.error_rate = 0.0
+    assert len(service.get_pending("companywall", companies)) == len(companies)
+    assert service.get_company_details_from_companywall(companies) == []
+    assert service.detail_store.count("companywall") == len(companies)
+    assert len(service.job_state.done_keys("companywall")) == len(companies)
@@ -0,0 +1,51 @@
+import csv
+import gzip
+
+import pytest
+
+from services import CsvExport
+from .conftest import interrupt_listing
+
+def read_rows(file_path: str) -> list[list[str]]:
+    opener = gzip.open if file_path.endswith(".gz") else open
+    with opener(file_path, 'rt', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+def test_export_all_companies_to_csv_resumes_after_an_interrupted_listing(stub, make_service, tmp_path, monkeypatch):
+    file_path = str(tmp_path / "companies.csv")
+    service = make_service()
+    interrupt_listing(service, 2000, monkeypatch)
+    service.export_all_companies_to_csv(file_path)
+
+    assert len(service.progress.get("error")) == 1
+    assert CsvExport(file_path, []).has_checkpoint()
+    assert len(read_rows(file_path)) == 1 + 2000
+
+    service = make_service()
+    service.export_all_companies_to_csv(file_path, resume=True)
+
+    rows = read_rows(file_path)
+    assert rows[0] == ['MBS', 'Ime']
+    assert len(rows) == 1 + stub.count
+    assert len({row[0] for row in rows[1:]}) == stub.count
+    assert not CsvExport(file_path, []).has_checkpoint()
+
+@pytest.mark.parametrize("file_name", ["rows.csv", "rows.csv.gz"])
+def test_csv_export_resumes_from_the_last_checkpoint(tmp_path, monkeypatch, file_name):
+    monkeypatch.setattr(CsvExport, "CHECKPOINT_EVERY", 10)
+    file_path = str(tmp_path / file_name)
+
+    with pytest.raises(KeyboardInterrupt):
+        with CsvExport(file_path, ["n"]) as export:
+            for n in range(25):
+                export.writerow([n])
+            raise KeyboardInterrupt()
+
+    # the rows after the last checkpoint are written again
+    with CsvExport(file_path, ["n"], resume=True) as export:
+        assert export.rows == 20
+        for n in range(export.rows, 30):
+            export.writerow([n])
+
+    assert read_rows(file_path) == [["n"]] + [[str(n)] for n in range(30)]
+    assert not export.has_checkpoint()
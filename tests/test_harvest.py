@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from services import HarvestPipeline
+from .conftest import interrupt_listing
+
+def test_fetch_all_companies_resumes_at_the_checkpoint(stub, make_service, monkeypatch):
+    first = make_service()
+    interrupt_listing(first, 2000, monkeypatch)
+    with pytest.raises(Exception, match="interrupted"):
+        first.fetch_all_companies()
+    assert first.db.count() == 2000
+    first.db.close()
+
+    requested = []
+    second = make_service()
+    get_company_list = second.sudreg_api.get_company_list
+    monkeypatch.setattr(second.sudreg_api, "get_company_list", lambda offset=None: requested.append(offset) or get_company_list(offset))
+
+    companies = second.fetch_all_companies(resume=True)
+    assert requested == [2000]
+    assert len(companies) == stub.count
+    assert len({c.mbs for c in companies}) == stub.count
+    assert second.job_state.get_checkpoint("list") == {"offset": stub.count, "finished": True}
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_fetch_company_details_marks_failed_companies_and_continues(stub, config, make_service, workers):
+    service = make_service()
+    service.config.fetch_workers = workers
+    companies = service.fetch_all_companies()[:60]
+
+    # every details request rolls once, so the seed decides how many of them fail
+    stub.error_rate = 0.2
+    stub.random = random.Random(7)
+    rolls = random.Random(7)
+    expected = [c.mbs for c in companies if rolls.random() < stub.error_rate]
+    assert expected
+
+    failed = service.fetch_company_details(companies)
+    if workers == 1:
+        assert [c.mbs for c in failed] == expected
+    assert len(failed) == len(expected)
+    assert len(service.progress.get("details_failed")) == len(expected)
+    assert service.job_state.retry_keys("details") == {str(c.mbs) for c in failed}
+    assert len(service.job_state.done_keys("details")) == len(companies) - len(expected)
+
+    # a retry run only asks for the failed companies again
+    stub.error_rate = 0.0
+    before = stub.stats["detalji_subjekta"]
+    assert service.fetch_company_details(companies, retry_failed=True) == []
+    assert stub.stats["detalji_subjekta"] - before == len(expected)
+    assert len(service.job_state.done_keys("details")) == len(companies)
+
+# the broken response fails half way through inject, after the activity and the address are read
+def broken_details(details: dict) -> dict:
+    return {**details, "email_adrese": [{}]}
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_fetch_company_details_fails_only_the_company_with_an_unreadable_response(stub, make_service, monkeypatch, workers):
+    service = make_service()
+    service.config.fetch_workers = workers
+    companies = service.fetch_all_companies()[:10]
+    get_details = service.sudreg_api.get_company_details_by_mbs
+    broken = companies[3].mbs
+    monkeypatch.setattr(service.sudreg_api, "get_company_details_by_mbs", lambda mbs: broken_details(get_details(mbs)) if mbs == broken else get_details(mbs))
+
+    failed = service.fetch_company_details(companies)
+    assert [c.mbs for c in failed] == [broken]
+    assert len(service.job_state.done_keys("details")) == len(companies) - 1
+    assert service.db.get_company_my_mbs(companies[4].mbs).djelatnost_sifra
+    # the stored company keeps its list row, nothing of the half injected details
+    assert not service.db.get_company_my_mbs(broken).djelatnost_sifra
+
+def test_pipeline_keeps_the_stored_company_when_inject_fails(stub, make_service, monkeypatch):
+    stub.count = 10
+    service = make_service()
+    companies = service.fetch_all_companies()
+    get_details = service.sudreg_api.get_company_details_by_mbs
+    broken = companies[3].mbs
+    monkeypatch.setattr(service.sudreg_api, "get_company_details_by_mbs", lambda mbs: broken_details(get_details(mbs)) if mbs == broken else get_details(mbs))
+
+    failed = HarvestPipeline(service, ["details"]).run()
+    assert [c.mbs for c in failed] == [broken]
+    assert not service.db.get_company_my_mbs(broken).djelatnost_sifra
+    assert all(service.db.get_company_my_mbs(c.mbs).djelatnost_sifra for c in companies if c.mbs != broken)
+
+def test_stub_rolls_are_reproducible(stub, make_service):
+    service = make_service()
+    service.fetch_all_companies()
+    stub.error_rate = 0.5
+    results = []
+    for _ in range(2):
+        stub.random = random.Random(3)
+        outcome = []
+        for mbs in range(10_000_000, 10_000_020):
+            try:
+                service.sudreg_api.get_company_details_by_mbs(mbs)
+                outcome.append(True)
+            except Exception:
+                outcome.append(False)
+        results.append(outcome)
+    assert results[0] == results[1]
+    assert not all(results[0]) and any(results[0])
@@ -0,0 +1,16 @@
+from services import HarvestPipeline
+
+def test_pipeline_marks_companywall_failures_failed(stub, make_service):
+    stub.count = 30
+    service = make_service()
+    service.fetch_all_companies()
+
+    stub.error_rate = 1.0
+    failed = HarvestPipeline(service, ["companywall"]).run()
+    assert len(failed) == stub.count
+    assert service.detail_store.count("companywall") == 0
+    assert len(service.job_state.retry_keys("companywall")) == stub.count
+
+    stub.error_rate = 0.0
+    assert HarvestPipeline(service, ["companywall"]).run() == []
+    assert service.detail_store.count("companywall") == stub.count
@@ -0,0 +1,16 @@
+import pytest
+
+# the sitemap of more than SITEMAP_SIZE companies is an index with two nested sitemaps
+@pytest.mark.parametrize("extension", ["ndjson", "sqlite"])
+def test_seed_profile_index_stores_details_of_known_companies(stub, config, make_service, tmp_path, extension):
+    stub.count = 1010
+    config.db_file_path = str(tmp_path / f"companies.{extension}")
+    service = make_service()
+    companies = service.fetch_all_companies()
+
+    seeded = service.seed_profile_index(f"{stub.url}/sitemap.xml")
+    assert seeded == stub.count
+    assert service.profile_index.count() == stub.count
+    assert service.detail_store.count("companywall") == stub.count
+    assert service.detail_store.get("companywall", companies[-1].mbs)
+    assert service.profile_index.get(companies[-1].oib) == f"/tvrtka/profil/{companies[-1].oib}"
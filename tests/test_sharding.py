@@ -0,0 +1,46 @@
+import time
+
+from db import ShardCoordinator, open_database
+from services import sharding
+
+def test_shard_workers_list_every_company_once(stub, config, tmp_path):
+    stub.count = 4500
+    coordinator_path = str(tmp_path / "shards.sqlite")
+    output_dir = str(tmp_path / "shards")
+
+    assert sharding.run_shard_workers(2, coordinator_path, output_dir, ["list"], {"shard_size": 1000})
+
+    coordinator = ShardCoordinator(coordinator_path, 1000)
+    assert coordinator.is_finished()
+    assert coordinator.get_end() == stub.count
+    coordinator.close()
+
+    sharding.merge_shards(output_dir, config.db_file_path)
+    db = open_database(config.db_file_path)
+    assert db.count() == stub.count
+    db.close()
+
+def test_expired_lease_goes_to_the_next_worker_and_the_first_loses_it(tmp_path):
+    coordinator = ShardCoordinator(str(tmp_path / "shards.sqlite"), 100, lease_seconds=0.05)
+    assert coordinator.acquire("a") == (0, 100)
+    time.sleep(0.1)
+
+    assert coordinator.acquire("b") == (0, 100)
+    assert not coordinator.renew(0, "a")
+    assert not coordinator.complete(0, "a", 100, False)
+    assert coordinator.complete(0, "b", 100, False)
+    assert coordinator.counts() == {ShardCoordinator.DONE: 1}
+    coordinator.close()
+
+def test_unexpired_lease_is_not_handed_out_twice(tmp_path):
+    coordinator = ShardCoordinator(str(tmp_path / "shards.sqlite"), 100)
+    assert coordinator.acquire("a") == (0, 100)
+    assert coordinator.acquire("b") == (100, 200)
+    assert coordinator.renew(0, "a")
+    assert coordinator.complete(100, "b", 40, True)
+    assert coordinator.get_end() == 140
+    assert not coordinator.is_finished()
+    assert coordinator.complete(0, "a", 100, False)
+    assert coordinator.is_finished()
+    assert coordinator.acquire("c") is None
+    coordinator.close()
@@ -1,22 +1,26 @@
 import json
+import os
 from config import Config
 from api_clients import SudregApiClient
 from termcolor import colored
-from services import SudregService
-from db import Database
+from services import SudregService, HarvestPipeline
+from db import Database, SqliteDatabase, open_database
+import metrics
 
 class CompanyLoop:
     config: Config
     sudreg_api: SudregApiClient
     sudreg_service: SudregService
-    db: Database
+    db: Database | SqliteDatabase
+    exporters: list
 
     def __init__(self, config: Config):
         self.config = config
         self.sudreg_api = SudregApiClient(config)
         self.sudreg_api.authenticate()
-        self.db = Database(self.config.db_file_path)
+        self.db = open_database(self.config.db_file_path)
         self.sudreg_service = SudregService(self.sudreg_api, self.db, self.config)
+        self.exporters = metrics.start_exporters(config)
 
     def print_table(self, data: dict, title_length: int = 20, header: bool = False):
         if header:
@@ -73,10 +77,15 @@ class CompanyLoop:
         menu = {
             "fa": "Fetch all companies from Sudreg",
             "fd": "Fetch company details from Sudreg",
+            "ds": "Delta sync companies from Sudreg",
             "all_csv": "Export all companies to CSV",
             "oib": "Get single company details by OIB",
             "csv": "Export companies to CSV",
+            "pq": "Export companies to Parquet",
+            "pqd": "Export Sudreg company details to Parquet",
             "cw": "Get company details from CompanyWall",
+            "cws": "Seed CompanyWall profile index from a sitemap",
+            "p": "Fetch companies, details and CompanyWall details in one pipeline",
             "q": "Exit",
         }
         self.print_table(menu)
@@ -93,22 +102,71 @@ class CompanyLoop:
             if choice.lower() == "n":
                 return
 
-        self.sudreg_service.fetch_all_companies()
+        offset = self.sudreg_service.get_resume_offset()
+        resume = False
+        if offset > 0:
+            choice = input(f"Do you want to continue from offset {offset}? [Y/n] ") or "y"
+            resume = choice.lower() == "y"
+
+        self.sudreg_service.fetch_all_companies(resume)
+
+    # the service reports the count again once the fetch starts, the menu only asks
+    def confirm_fetch(self, count: int) -> bool:
+        choice = input(f"Fetch company details for {colored(str(count), 'yellow')} companies? [y/N] ") or "n"
+        return choice.lower() == "y"
 
     def fetch_company_details_from_sudreg(self):
         all = self.db.get_all_companies()
-        self.sudreg_service.fetch_company_details(all)
+        if self.confirm_fetch(len(all)):
+            self.sudreg_service.fetch_company_details(all)
+
+    def sync_companies_from_sudreg(self):
+        self.sudreg_service.sync_companies()
+
+    def ask_resume_export(self, file_path: str) -> bool:
+        if not os.path.exists(f"{file_path}.checkpoint"):
+            return False
+        choice = input("An unfinished export exists, resume it? [Y/n] ") or "y"
+        return choice.lower() == "y"
 
     def export_companies_to_csv(self):
-        file_path = input("Enter the path to the CSV file: ")
-        self.sudreg_service.export_to_csv(file_path)
+        file_path = input("Enter the path to the CSV file (.csv.gz for gzip): ")
+        self.sudreg_service.export_to_csv(file_path, resume=self.ask_resume_export(file_path))
+
+    def export_companies_to_parquet(self):
+        file_path = input("Enter the path to the Parquet file: [data/companies.parquet]") or "data/companies.parquet"
+        self.sudreg_service.export_to_parquet(file_path)
+
+    def export_details_to_parquet(self):
+        file_path = input("Enter the path to the Parquet file: [data/details.parquet]") or "data/details.parquet"
+        self.sudreg_service.export_details_to_parquet(file_path)
 
     def get_company_details_from_companywall(self):
-        self.sudreg_service.get_company_details_from_companywall()
+        companies = self.db.get_all_companies()
+        if self.confirm_fetch(len(companies)):
+            self.sudreg_service.get_company_details_from_companywall(companies)
+
+    def seed_profile_index(self):
+        default_url = f"{self.config.companywall_url.rstrip('/')}/sitemap.xml"
+        sitemap_url = input(f"Enter the sitemap URL: [{default_url}]") or default_url
+        self.sudreg_service.seed_profile_index(sitemap_url)
+
+    def run_pipeline(self):
+        choice = input("Include CompanyWall details? [y/N] ") or "n"
+        stages = ["list", "details", "companywall"] if choice.lower() == "y" else ["list", "details"]
+
+        resume = False
+        offset = self.sudreg_service.get_resume_offset()
+        if offset > 0:
+            choice = input(f"Do you want to continue the company list from offset {offset}? [Y/n] ") or "y"
+            resume = choice.lower() == "y"
+
+        failed = HarvestPipeline(self.sudreg_service, stages).run(resume)
+        print(f"Pipeline finished, failed: {colored(str(len(failed)), 'yellow')}")
 
     def export_all_companies_to_csv(self):
         file_path = input("Enter the path to the CSV file: [data/all_companies.csv]") or "data/all_companies.csv"
-        self.sudreg_service.export_all_companies_to_csv(file_path)
+        self.sudreg_service.export_all_companies_to_csv(file_path, resume=self.ask_resume_export(file_path))
 
     def start_main_loop(self):
         print("\033[2J\033[H")
@@ -121,15 +179,26 @@ class CompanyLoop:
                 self.fetch_all_companies_from_sudreg()
             elif choice == "fd":
                 self.fetch_company_details_from_sudreg()
+            elif choice == "ds":
+                self.sync_companies_from_sudreg()
             elif choice == "all_csv":
                 self.export_all_companies_to_csv()
             elif choice == "oib":
                 self.company_details()
             elif choice == "csv":
                 self.export_companies_to_csv()
+            elif choice == "pq":
+                self.export_companies_to_parquet()
+            elif choice == "pqd":
+                self.export_details_to_parquet()
             elif choice == "cw":
                 self.get_company_details_from_companywall()
+            elif choice == "cws":
+                self.seed_profile_index()
+            elif choice == "p":
+                self.run_pipeline()
             elif choice == "q":
+                metrics.close_exporters(self.exporters)
                 break
             else:
                 print("Invalid choice")